@@ -0,0 +1,94 @@
+"""
+Measure the cost of request validation against the inline parsing it replaced.
+
+"inline" is what the views used to do: json.loads and dict lookups, with the
+datetime strings passed through unvalidated. "schema" is parse_body, which
+decodes straight into the msgspec schema with its precompiled decoder,
+checking types and bounds and parsing the datetimes. Usage (from the
+pos_backend directory):
+
+    python benchmarks/request_parsing.py [--number 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+BODIES = {
+    'accept_preparation': json.dumps({
+        'preparation_id': 1,
+        'ready_at': '2025-12-17T17:00:00Z',
+    }).encode(),
+    'preparation_created': json.dumps({
+        'order_id': 'ORD-12345',
+        'items': [
+            {'name': 'Burger', 'quantity': 2, 'notes': 'No onions'},
+            {'name': 'Fries', 'quantity': 1, 'notes': ''},
+            {'name': 'Cola'},
+        ],
+    }).encode(),
+}
+
+
+def inline_accept_preparation(body):
+    try:
+        data = json.loads(body)
+        return data['preparation_id'], data['ready_at']
+    except KeyError:
+        return None
+    except json.JSONDecodeError:
+        return None
+
+
+def inline_preparation_created(body):
+    try:
+        data = json.loads(body)
+        order_id = data['order_id']
+        items = [
+            (item['name'], item.get('quantity', 1), item.get('notes', ''))
+            for item in data.get('items', [])
+        ]
+        return order_id, items
+    except KeyError:
+        return None
+    except json.JSONDecodeError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pos_backend.settings')
+    import django
+    django.setup()
+    from preparations.schemas import AcceptPreparationRequest, PreparationCreatedRequest, parse_body
+
+    cases = [
+        (
+            'accept_preparation',
+            lambda: inline_accept_preparation(BODIES['accept_preparation']),
+            lambda: parse_body(AcceptPreparationRequest, BODIES['accept_preparation']),
+        ),
+        (
+            'preparation_created',
+            lambda: inline_preparation_created(BODIES['preparation_created']),
+            lambda: parse_body(PreparationCreatedRequest, BODIES['preparation_created']),
+        ),
+    ]
+
+    print(f"{'endpoint':<20} {'inline (us)':>12} {'schema (us)':>12}")
+    for name, inline, schema in cases:
+        inline_us = min(timeit.repeat(inline, number=args.number, repeat=3)) / args.number * 1_000_000
+        schema_us = min(timeit.repeat(schema, number=args.number, repeat=3)) / args.number * 1_000_000
+        print(f"{name:<20} {inline_us:>12.2f} {schema_us:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
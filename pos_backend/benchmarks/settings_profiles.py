@@ -0,0 +1,107 @@
+"""
+Compare cold start time and per-request overhead of the settings profiles.
+
+Each profile is measured in a fresh interpreter so import caches don't leak
+between runs. Usage (from the pos_backend directory):
+
+    python benchmarks/settings_profiles.py [--requests 2000] [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROFILES = ['full', 'api']
+
+
+def measure(profile: str, requests: int):
+    """Measure a single profile. Runs inside the worker subprocess."""
+    start = time.perf_counter()
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.urls import get_resolver
+    WSGIHandler()
+    get_resolver().url_patterns
+    startup = time.perf_counter() - start
+
+    from django.test import Client
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        client = Client()
+        # Warm up caches (URL resolver, DB connection, middleware chain)
+        for _ in range(50):
+            client.get('/api/preparations/')
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get('/api/preparations/')
+        per_request = (time.perf_counter() - start) / requests
+    finally:
+        runner.teardown_databases(old_config)
+
+    return {
+        'profile': profile,
+        'startup_ms': startup * 1000,
+        'per_request_us': per_request * 1_000_000,
+        'modules': len(sys.modules),
+        'middleware': len(settings.MIDDLEWARE),
+    }
+
+
+def run_worker(profile: str, requests: int):
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='pos_backend.settings',
+        POS_SETTINGS_PROFILE=profile,
+    )
+    env.pop('PREPARATION_WEBHOOK_URL', None)
+    output = subprocess.check_output(
+        [sys.executable, __file__, '--worker', profile, '--requests', str(requests)],
+        cwd=BASE_DIR,
+        env=env,
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def summarize(values: list):
+    return f"{statistics.median(values):.1f} ({min(values):.1f}-{max(values):.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--worker', choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, str(BASE_DIR))
+        print(json.dumps(measure(args.worker, args.requests)))
+        return
+
+    print(f"Median and spread (min-max) over {args.runs} runs per profile")
+    print(f"{'profile':<8} {'startup (ms)':>22} {'request (us)':>24} {'modules':>8} {'middleware':>11}")
+    for profile in PROFILES:
+        results = [run_worker(profile, args.requests) for _ in range(args.runs)]
+        print(
+            f"{profile:<8} "
+            f"{summarize([r['startup_ms'] for r in results]):>22} "
+            f"{summarize([r['per_request_us'] for r in results]):>24} "
+            f"{results[0]['modules']:>8} "
+            f"{results[0]['middleware']:>11}"
+        )
+
+if __name__ == '__main__':
+    main()
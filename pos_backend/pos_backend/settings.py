@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import json
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -71,6 +74,31 @@ TEMPLATES = [
 WSGI_APPLICATION = 'pos_backend.wsgi.application'
 
 
+# Settings profile
+# "full" (default) loads admin, auth, sessions and the full middleware stack.
+# "api" only loads what the preparations JSON endpoints need, which cuts
+# cold start time and per-request middleware overhead on API-only workers.
+# See benchmarks/settings_profiles.py for a comparison of the two.
+SETTINGS_PROFILE = os.environ.get('POS_SETTINGS_PROFILE', 'full')
+
+if SETTINGS_PROFILE not in ('full', 'api'):
+    raise ImproperlyConfigured(
+        f"Unknown POS_SETTINGS_PROFILE {SETTINGS_PROFILE!r}, expected 'full' or 'api'"
+    )
+
+if SETTINGS_PROFILE == 'api':
+    INSTALLED_APPS = [
+        'preparations',
+    ]
+
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+
+    TEMPLATES = []
+
+
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
@@ -78,9 +106,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so concurrent
+        # transactions wait for each other instead of failing with
+        # "database is locked" when upgrading a read lock
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+# Locations (kitchens) sharing this deployment
+# Preparations are scoped to a location. Requests that don't specify one use
+# PREPARATION_DEFAULT_LOCATION. High-volume locations can be moved to their
+# own database by mapping them to a database alias, e.g.
+#   PREPARATION_LOCATION_DATABASES='{"oslo-central": "oslo_central"}'
+# Aliases missing from DATABASES get their own SQLite file.
+PREPARATION_DEFAULT_LOCATION = os.environ.get('PREPARATION_DEFAULT_LOCATION', 'default')
+PREPARATION_LOCATION_DATABASES = json.loads(os.environ.get('PREPARATION_LOCATION_DATABASES', '{}'))
+
+for alias in PREPARATION_LOCATION_DATABASES.values():
+    DATABASES.setdefault(alias, {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db_{alias}.sqlite3',
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+    })
+
+DATABASE_ROUTERS = ['preparations.routers.LocationRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -124,6 +174,12 @@ STATIC_URL = 'static/'
 # when preparations are updated (completed, delayed, cancelled, etc.)
 PREPARATION_WEBHOOK_URL = os.environ.get('PREPARATION_WEBHOOK_URL', None)
 
+# Number of events between full-state snapshots in the preparation event log
+PREPARATION_SNAPSHOT_INTERVAL = int(os.environ.get('PREPARATION_SNAPSHOT_INTERVAL', 20))
+
+# Maximum number of queued client operations accepted in one sync request
+PREPARATION_SYNC_MAX_OPERATIONS = int(os.environ.get('PREPARATION_SYNC_MAX_OPERATIONS', 500))
+
 
 # Logging configuration
 LOGGING = {
@@ -1,3 +1,323 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import Preparation, Item, PreparationEvent
+from .events import record_event
+from .routers import database_for_location, default_location, get_location_databases, has_own_database
+from .signals import dispatch_change
 
-# Register your models here.
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) over the whole table.
+
+    Counting stops at `exact_count_limit` rows, which is cheap. Below that
+    the count is exact. Above it, listings that cover their whole table use
+    the highest primary key as an estimate. Other listings report the
+    capped count, with `is_capped` set so it is shown as "10000+". Either
+    way `is_estimate` is set so the changelist can label the total as
+    approximate.
+
+    `covers_table` defaults to whether the queryset is unfiltered. Admins
+    that always scope their listings pass it explicitly.
+    """
+    exact_count_limit = 10000
+
+    is_estimate = False
+    is_capped = False
+
+    def __init__(self, *args, covers_table=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.covers_table = covers_table
+
+    @cached_property
+    def count(self):
+        limit = self.exact_count_limit
+        counted = self.object_list.order_by().values('pk')[:limit + 1].count()
+        if counted <= limit:
+            return counted
+
+        self.is_estimate = True
+        covers_table = self.covers_table
+        if covers_table is None:
+            covers_table = not self.object_list.query.where
+        if not covers_table:
+            self.is_capped = True
+            return counted
+        estimate = self.object_list.aggregate(estimate=Max('pk'))['estimate'] or 0
+        return max(estimate, counted)
+
+
+class LocationFilter(admin.SimpleListFilter):
+    """
+    Pick the location the admin is scoped to.
+
+    The choices come from settings rather than from the data, so showing the
+    filter doesn't cost a SELECT DISTINCT. There is no "All" choice: listings
+    always cover a single location, on the database it lives on, so the
+    status filters can use the (location, ...) indexes.
+    """
+    title = 'location'
+    parameter_name = 'location'
+
+    def lookups(self, request, model_admin):
+        locations = [default_location(), *get_location_databases()]
+        return [(location, location) for location in dict.fromkeys(locations)]
+
+    def value(self):
+        return super().value() or default_location()
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        # Scoping is done by LocationScopedAdmin.get_queryset, so it also
+        # applies to change pages and actions
+        return queryset
+
+
+def admin_location(request):
+    """Get the location an admin request is scoped to."""
+    location = request.GET.get(LocationFilter.parameter_name)
+    if location is None and '_changelist_filters' in request.GET:
+        # Change pages carry the changelist filters they were opened from
+        location = QueryDict(request.GET['_changelist_filters']).get(LocationFilter.parameter_name)
+    return location or default_location()
+
+
+class LocationScopedAdmin(admin.ModelAdmin):
+    """Admin for a location-scoped model, routed to the database of the selected location."""
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_location(admin_location(request))
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        kwargs.setdefault('using', database_for_location(admin_location(request)))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        # An unfiltered listing covers the whole table only when its location
+        # has a database to itself. Locations sharing a database share one id
+        # sequence, so MAX(pk) would count the other locations too.
+        covers_table = (
+            has_own_database(admin_location(request))
+            and queryset.query.where == self.get_queryset(request).query.where
+        )
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, covers_table=covers_table)
+
+
+class PreparationStatusFilter(admin.SimpleListFilter):
+    """Filter preparations by status, mirroring the tabs on the kitchen dashboard."""
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('incoming', 'Incoming'),
+            ('in_progress', 'In progress'),
+            ('completed', 'Completed'),
+            ('rejected', 'Rejected'),
+            ('cancelled', 'Cancelled'),
+            ('cancelled_by_customer', 'Cancelled by customer'),
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == 'incoming':
+            return queryset.filter(accepted_at__isnull=True, rejected_at__isnull=True, cancelled_at__isnull=True)
+        if value == 'in_progress':
+            return queryset.filter(
+                accepted_at__isnull=False,
+                completed_at__isnull=True,
+                rejected_at__isnull=True,
+                cancelled_at__isnull=True,
+            )
+        if value == 'completed':
+            return queryset.filter(completed_at__isnull=False)
+        if value == 'rejected':
+            return queryset.filter(rejected_at__isnull=False)
+        if value == 'cancelled':
+            return queryset.filter(cancelled_at__isnull=False, cancelled_by_customer=False)
+        if value == 'cancelled_by_customer':
+            return queryset.filter(cancelled_at__isnull=False, cancelled_by_customer=True)
+        return queryset
+
+
+class ItemStatusFilter(admin.SimpleListFilter):
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('open', 'Open'),
+            ('completed', 'Completed'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'open':
+            return queryset.filter(completed_at__isnull=True)
+        if self.value() == 'completed':
+            return queryset.filter(completed_at__isnull=False)
+        return queryset
+
+
+class ItemInline(admin.TabularInline):
+    model = Item
+    extra = 0
+    fields = ['name', 'quantity', 'notes', 'completed_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(database_for_location(admin_location(request)))
+
+
+class PreparationEventInline(admin.TabularInline):
+    model = PreparationEvent
+    extra = 0
+    fields = ['sequence', 'event_type', 'item', 'data', 'recorded_at']
+    readonly_fields = fields
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(database_for_location(admin_location(request)))
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+def _bulk_update(queryset, changed_fields: list, **values):
+    """
+    Apply `values` to every preparation in `queryset` with a single UPDATE.
+
+    `update()` bypasses the save signals, so events and webhooks are
+    dispatched explicitly for each updated preparation afterwards.
+    """
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return 0
+
+    with transaction.atomic(using=queryset.db):
+        preparations = Preparation.objects.using(queryset.db).filter(pk__in=pks)
+        updated = preparations.update(**values)
+        for preparation in preparations:
+            dispatch_change(preparation, changed_fields)
+    return updated
+
+
+def _bulk_complete_items(queryset, completed_at):
+    """Complete the open items of every preparation in `queryset` with a single UPDATE."""
+    items = Item.objects.using(queryset.db).filter(
+        preparation__in=queryset.values('pk'),
+        completed_at__isnull=True,
+    )
+    open_items = list(items.select_related('preparation'))
+    items.update(completed_at=completed_at)
+    for item in open_items:
+        record_event(item.preparation, 'item.completed', {'completed_at': completed_at}, item=item)
+
+
+@admin.register(Preparation)
+class PreparationAdmin(LocationScopedAdmin):
+    list_display = [
+        'id',
+        'location',
+        'order_id',
+        'created_at',
+        'accepted_at',
+        'ready_at',
+        'completed_at',
+        'rejected_at',
+        'cancelled_at',
+        'cancelled_by_customer',
+        'item_count',
+    ]
+    list_filter = [LocationFilter, PreparationStatusFilter]
+    search_fields = ['order_id__exact']
+    ordering = ['-id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    inlines = [ItemInline, PreparationEventInline]
+    actions = ['reject_preparations', 'cancel_preparations', 'complete_preparations']
+
+    def has_delete_permission(self, request, obj=None):
+        # Deleting a preparation would delete its event log with it; reject
+        # or cancel it instead
+        return False
+
+    def get_queryset(self, request):
+        # Correlated subquery so item counts are only computed for the rows on the current page
+        item_count = (
+            Item.objects.filter(preparation=OuterRef('pk'))
+            .order_by()
+            .values('preparation')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return super().get_queryset(request).annotate(
+            item_count=Subquery(item_count, output_field=IntegerField())
+        )
+
+    @admin.display(description='Items')
+    def item_count(self, obj):
+        return obj.item_count or 0
+
+    @admin.action(description='Reject selected preparations')
+    def reject_preparations(self, request, queryset):
+        updated = _bulk_update(
+            queryset.filter(rejected_at__isnull=True),
+            ['rejected_at'],
+            rejected_at=timezone.now(),
+        )
+        self.message_user(request, f'Rejected {updated} preparation(s).')
+
+    @admin.action(description='Cancel selected preparations')
+    def cancel_preparations(self, request, queryset):
+        updated = _bulk_update(
+            queryset.filter(cancelled_at__isnull=True),
+            ['cancelled_at'],
+            cancelled_at=timezone.now(),
+        )
+        self.message_user(request, f'Cancelled {updated} preparation(s).')
+
+    @admin.action(description='Mark selected preparations as completed')
+    def complete_preparations(self, request, queryset):
+        # Items are completed too, so the preparation never ends up completed with open items
+        queryset = queryset.filter(completed_at__isnull=True)
+        now = timezone.now()
+        with transaction.atomic(using=queryset.db):
+            _bulk_complete_items(queryset, now)
+            updated = _bulk_update(queryset, ['completed_at'], completed_at=now)
+        self.message_user(request, f'Completed {updated} preparation(s).')
+
+
+@admin.register(Item)
+class ItemAdmin(LocationScopedAdmin):
+    list_display = ['id', 'location', 'name', 'quantity', 'preparation', 'completed_at']
+    list_filter = [LocationFilter, ItemStatusFilter]
+    list_select_related = ['preparation']
+    search_fields = ['preparation__order_id__exact']
+    raw_id_fields = ['preparation']
+    ordering = ['-id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Look the orders up first. Joined to the preparation, SQLite walks
+        # every item of the location in id order instead of using the
+        # preparation index.
+        order_ids = search_term.split()
+        if not order_ids:
+            return queryset, False
+        preparations = Preparation.objects.for_location(admin_location(request)).filter(order_id__in=order_ids)
+        return queryset.filter(preparation_id__in=list(preparations.values_list('pk', flat=True))), False
@@ -0,0 +1,96 @@
+import copy
+from datetime import date, datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from .models import Preparation, PreparationEvent, PreparationSnapshot
+
+DEFAULT_SNAPSHOT_INTERVAL = 20
+
+
+def get_snapshot_interval():
+    """Get the number of events between snapshots from settings."""
+    return getattr(settings, 'PREPARATION_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL)
+
+
+def encode_value(value):
+    """Encode a field value for storage in an event or snapshot."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def empty_state():
+    return {'items': {}}
+
+
+def apply_event(state: dict, event: PreparationEvent):
+    """Apply a single event delta to a state dict in place."""
+    if event.event_type == 'item.removed':
+        state['items'].pop(str(event.item_id), None)
+    elif event.item_id:
+        state['items'].setdefault(str(event.item_id), {}).update(event.data)
+    else:
+        state.update(event.data)
+    return state
+
+
+def record_event(preparation: Preparation, event_type: str, data: dict, item=None):
+    """
+    Append an event to the preparation's log.
+
+    A snapshot of the full state is written every `PREPARATION_SNAPSHOT_INTERVAL`
+    events so rebuilding never replays more than that many events.
+    """
+    data = {field: encode_value(value) for field, value in data.items()}
+
+    db = preparation._state.db
+    with transaction.atomic(using=db):
+        # Lock the preparation row so concurrent appends can't allocate the same sequence
+        Preparation.objects.using(db).select_for_update().only('pk').get(pk=preparation.pk)
+        last_sequence = preparation.events.aggregate(last=Max('sequence'))['last'] or 0
+        event = PreparationEvent.objects.using(db).create(
+            preparation=preparation,
+            item=item,
+            sequence=last_sequence + 1,
+            event_type=event_type,
+            data=data,
+        )
+
+        interval = get_snapshot_interval()
+        if interval and event.sequence % interval == 0:
+            PreparationSnapshot.objects.using(db).create(
+                preparation=preparation,
+                sequence=event.sequence,
+                state=rebuild_state(preparation),
+                recorded_at=event.recorded_at,
+            )
+
+    return event
+
+
+def rebuild_state(preparation: Preparation, at=None):
+    """
+    Rebuild the state of a preparation from its event log.
+
+    Starts from the latest snapshot (taken at or before `at`) and replays the
+    remaining events. With `at=None` the current state is returned.
+    """
+    snapshots = preparation.snapshots.order_by('-sequence')
+    events = preparation.events.order_by('sequence')
+    if at is not None:
+        snapshots = snapshots.filter(recorded_at__lte=at)
+        events = events.filter(recorded_at__lte=at)
+
+    snapshot = snapshots.first()
+    if snapshot:
+        state = copy.deepcopy(snapshot.state)
+        events = events.filter(sequence__gt=snapshot.sequence)
+    else:
+        state = empty_state()
+
+    for event in events:
+        apply_event(state, event)
+
+    return state
+
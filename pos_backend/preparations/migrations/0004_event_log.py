@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-19 11:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preparations', '0003_preparation_cancelled_by_customer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreparationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('event_type', models.CharField(max_length=50)),
+                ('data', models.JSONField(default=dict)),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='preparations.item')),
+                ('preparation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='preparations.preparation')),
+            ],
+            options={
+                'ordering': ['preparation', 'sequence'],
+                'indexes': [models.Index(fields=['preparation', 'recorded_at'], name='event_prep_recorded_idx')],
+                'constraints': [models.UniqueConstraint(fields=('preparation', 'sequence'), name='unique_event_sequence')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PreparationSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('state', models.JSONField()),
+                ('recorded_at', models.DateTimeField()),
+                ('preparation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='preparations.preparation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['preparation', 'recorded_at'], name='snapshot_prep_recorded_idx')],
+                'constraints': [models.UniqueConstraint(fields=('preparation', 'sequence'), name='unique_snapshot_sequence')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preparations', '0004_event_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['completed_at'], name='item_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['accepted_at'], name='prep_accepted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['rejected_at'], name='prep_rejected_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['cancelled_at'], name='prep_cancelled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['completed_at'], name='prep_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0 on 2026-10-19 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preparations', '0005_status_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_completed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='preparation',
+            name='prep_accepted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='preparation',
+            name='prep_rejected_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='preparation',
+            name='prep_cancelled_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='preparation',
+            name='prep_completed_idx',
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='location',
+            field=models.CharField(default='default', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='preparation',
+            name='location',
+            field=models.CharField(default='default', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='preparation',
+            name='order_id',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['location', 'completed_at'], name='item_loc_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['order_id'], name='prep_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['location', 'accepted_at'], name='prep_loc_accepted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['location', 'rejected_at'], name='prep_loc_rejected_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['location', 'cancelled_at'], name='prep_loc_cancelled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['location', 'completed_at'], name='prep_loc_completed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='preparation',
+            constraint=models.UniqueConstraint(fields=('location', 'order_id'), name='unique_location_order'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preparations', '0006_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(default='default', max_length=50)),
+                ('operation_id', models.CharField(max_length=100)),
+                ('operation_type', models.CharField(max_length=50)),
+                ('client_timestamp', models.DateTimeField()),
+                ('status', models.CharField(max_length=20)),
+                ('result', models.JSONField()),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('location', 'operation_id'), name='unique_location_operation')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preparations', '0007_sync_operation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['location', 'id'], name='item_loc_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preparation',
+            index=models.Index(fields=['location', 'id'], name='prep_loc_id_idx'),
+        ),
+    ]
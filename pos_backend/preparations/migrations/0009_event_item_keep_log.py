@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preparations', '0008_location_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='preparationevent',
+            name='item',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='preparations.item'),
+        ),
+    ]
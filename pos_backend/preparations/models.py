@@ -1,8 +1,17 @@
 from django.db import models
+from django.utils import timezone
+from .routers import database_for_location, DEFAULT_LOCATION
+
+
+class LocationQuerySet(models.QuerySet):
+    def for_location(self, location: str):
+        """Restrict to a single location, on the database that location lives on."""
+        return self.using(database_for_location(location)).filter(location=location)
 
 
 class Preparation(models.Model):
-    order_id = models.CharField(max_length=100, unique=True)
+    location = models.CharField(max_length=50, default=DEFAULT_LOCATION)
+    order_id = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     accepted_at = models.DateTimeField(null=True, blank=True)
     ready_at = models.DateTimeField(null=True, blank=True)
@@ -12,6 +21,22 @@ class Preparation(models.Model):
     delayed_to = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = LocationQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'order_id'], name='unique_location_order'),
+        ]
+        indexes = [
+            models.Index(fields=['order_id'], name='prep_order_idx'),
+            # Admin listings are scoped to a location and ordered by id
+            models.Index(fields=['location', 'id'], name='prep_loc_id_idx'),
+            models.Index(fields=['location', 'accepted_at'], name='prep_loc_accepted_idx'),
+            models.Index(fields=['location', 'rejected_at'], name='prep_loc_rejected_idx'),
+            models.Index(fields=['location', 'cancelled_at'], name='prep_loc_cancelled_idx'),
+            models.Index(fields=['location', 'completed_at'], name='prep_loc_completed_idx'),
+        ]
+
     def __str__(self):
         return f"Preparation {self.id} - {self.order_id}"
 
@@ -21,11 +46,99 @@ class Preparation(models.Model):
 
 
 class Item(models.Model):
+    # Denormalized from the preparation so item queries can be scoped to a location
+    location = models.CharField(max_length=50, default=DEFAULT_LOCATION)
     preparation = models.ForeignKey(Preparation, on_delete=models.CASCADE, related_name='items')
     name = models.CharField(max_length=255)
     quantity = models.PositiveIntegerField(default=1)
     notes = models.TextField(blank=True, default='')
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = LocationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'id'], name='item_loc_id_idx'),
+            models.Index(fields=['location', 'completed_at'], name='item_loc_completed_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} (x{self.quantity})"
+
+    def save(self, *args, **kwargs):
+        self.location = self.preparation.location
+        super().save(*args, **kwargs)
+
+
+class PreparationEvent(models.Model):
+    """Append-only record of a single lifecycle change.
+
+    `data` only holds the fields that changed (a delta), so replaying the
+    events of a preparation in `sequence` order rebuilds its state.
+
+    Deleting an item keeps its events (and records an `item.removed` event),
+    so `item` may point at an item that no longer exists.
+    """
+    preparation = models.ForeignKey(Preparation, on_delete=models.CASCADE, related_name='events')
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='events',
+    )
+    sequence = models.PositiveIntegerField()
+    event_type = models.CharField(max_length=50)
+    data = models.JSONField(default=dict)
+    recorded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['preparation', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['preparation', 'sequence'], name='unique_event_sequence'),
+        ]
+        indexes = [
+            models.Index(fields=['preparation', 'recorded_at'], name='event_prep_recorded_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.sequence} - {self.preparation_id}"
+
+
+class PreparationSnapshot(models.Model):
+    """Full state of a preparation after the event with the same `sequence`."""
+    preparation = models.ForeignKey(Preparation, on_delete=models.CASCADE, related_name='snapshots')
+    sequence = models.PositiveIntegerField()
+    state = models.JSONField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['preparation', 'sequence'], name='unique_snapshot_sequence'),
+        ]
+        indexes = [
+            models.Index(fields=['preparation', 'recorded_at'], name='snapshot_prep_recorded_idx'),
+        ]
+
+    def __str__(self):
+        return f"Snapshot #{self.sequence} - {self.preparation_id}"
+
+
+class SyncOperation(models.Model):
+    """Client operation applied through the sync endpoint, kept so retries are idempotent."""
+    location = models.CharField(max_length=50, default=DEFAULT_LOCATION)
+    operation_id = models.CharField(max_length=100)
+    operation_type = models.CharField(max_length=50)
+    client_timestamp = models.DateTimeField()
+    status = models.CharField(max_length=20)
+    result = models.JSONField()
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'operation_id'], name='unique_location_operation'),
+        ]
+
+    def __str__(self):
+        return f"{self.operation_type} {self.operation_id} - {self.status}"
@@ -0,0 +1,71 @@
+from django.conf import settings
+
+DEFAULT_LOCATION = 'default'
+
+
+def default_location():
+    """Get the location used when a request doesn't specify one."""
+    return getattr(settings, 'PREPARATION_DEFAULT_LOCATION', DEFAULT_LOCATION)
+
+
+def get_location_databases():
+    """Get the mapping of locations to database aliases from settings."""
+    return getattr(settings, 'PREPARATION_LOCATION_DATABASES', {})
+
+
+def database_for_location(location: str):
+    """Get the database alias a location lives on. Unmapped locations use 'default'."""
+    return get_location_databases().get(location, 'default')
+
+
+def has_own_database(location: str):
+    """Check whether a location is the only one on its database."""
+    databases = get_location_databases()
+    database = databases.get(location)
+    if database is None or database == 'default':
+        return False
+    return list(databases.values()).count(database) == 1
+
+
+class LocationRouter:
+    """
+    Route preparations and items to the database of their location.
+
+    Reads of a whole location should go through `for_location()`, which picks
+    the database explicitly. This router covers saves, and related lookups
+    from an instance that is already bound to a location.
+    """
+
+    def _database_for_instance(self, instance):
+        if instance is None:
+            return None
+        if instance._state.db:
+            return instance._state.db
+        location = getattr(instance, 'location', None)
+        if location is not None:
+            return database_for_location(location)
+        # Events and snapshots follow their preparation
+        if getattr(instance, 'preparation_id', None):
+            return self._database_for_instance(instance.preparation)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'preparations':
+            return None
+        return self._database_for_instance(hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != 'preparations':
+            return None
+        return self._database_for_instance(hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._meta.app_label == 'preparations' and obj2._meta.app_label == 'preparations':
+            return obj1._state.db == obj2._state.db
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'preparations':
+            return db == 'default' or db in get_location_databases().values()
+        # Everything else (admin, auth, sessions) only lives on the default database
+        return db == 'default'
@@ -0,0 +1,215 @@
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from typing import Annotated
+import msgspec
+from django.http import JsonResponse
+from django.utils import timezone
+from .routers import default_location
+
+
+class SchemaError(ValueError):
+    """Raised when a request does not match its schema."""
+
+
+class NotFound(Exception):
+    """Raised by views when a referenced object does not exist."""
+
+
+# Field constraints, matching the model fields they end up in
+MAX_INT = 2**31 - 1  # PositiveIntegerField and AutoField
+Id = Annotated[int, msgspec.Meta(ge=1, le=MAX_INT)]
+Quantity = Annotated[int, msgspec.Meta(ge=1, le=MAX_INT)]
+Location = Annotated[str, msgspec.Meta(min_length=1, max_length=50)]
+OrderId = Annotated[str, msgspec.Meta(min_length=1, max_length=100)]
+ItemName = Annotated[str, msgspec.Meta(min_length=1, max_length=255)]
+OperationId = Annotated[str, msgspec.Meta(min_length=1, max_length=100)]
+
+
+# Datetimes outside this range are rejected rather than stored
+EARLIEST_DATETIME = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+LATEST_DATETIME = datetime(3000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _make_aware(struct, *fields):
+    """
+    Interpret naive datetimes on `struct` in the current time zone.
+
+    Raises ValueError (reported as a validation error) for datetimes that
+    can't be converted to UTC or fall outside the supported range.
+    """
+    for field in fields:
+        value = getattr(struct, field)
+        if value is None:
+            continue
+        try:
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            in_range = EARLIEST_DATETIME <= value.astimezone(dt_timezone.utc) < LATEST_DATETIME
+        except (OverflowError, ValueError):
+            in_range = False
+        if not in_range:
+            raise ValueError(f"Invalid value for '{field}': datetime out of range")
+        setattr(struct, field, value)
+
+
+# Request schemas
+#
+# Each schema is a msgspec Struct. The JSON body is decoded straight into
+# it and validated in one pass, so views receive typed values that already
+# satisfy the constraints above. Every top-level request is scoped to a
+# location, which defaults to PREPARATION_DEFAULT_LOCATION when the request
+# doesn't name one.
+
+class LocationRequest(msgspec.Struct, kw_only=True):
+    location: Location = msgspec.field(default_factory=default_location)
+
+
+class ItemRequest(msgspec.Struct):
+    name: ItemName
+    quantity: Quantity = 1
+    notes: str = ''
+
+
+class PreparationCreatedRequest(LocationRequest):
+    order_id: OrderId
+    items: list[ItemRequest] = []
+
+
+class OrderRequest(LocationRequest):
+    order_id: OrderId
+
+
+class ItemIdRequest(LocationRequest):
+    item_id: Id
+
+
+class PreparationIdRequest(LocationRequest):
+    preparation_id: Id
+
+
+class AcceptPreparationRequest(LocationRequest):
+    preparation_id: Id
+    ready_at: datetime
+
+    def __post_init__(self):
+        _make_aware(self, 'ready_at')
+
+
+class DelayPreparationRequest(LocationRequest):
+    preparation_id: Id
+    delayed_to: datetime
+
+    def __post_init__(self):
+        _make_aware(self, 'delayed_to')
+
+
+class HistoryRequest(LocationRequest):
+    order_id: OrderId
+    at: datetime | None = None
+
+    def __post_init__(self):
+        _make_aware(self, 'at')
+
+
+SYNC_OPERATION_TYPES = (
+    'accept_preparation',
+    'reject_preparation',
+    'cancel_preparation',
+    'delay_preparation',
+    'complete_item',
+)
+
+
+class SyncOperationRequest(msgspec.Struct):
+    # `type` is checked when the operation is applied, so one unknown
+    # operation is reported in its result instead of failing the batch
+    operation_id: OperationId
+    type: str
+    client_timestamp: datetime
+    preparation_id: Id | None = None
+    item_id: Id | None = None
+    ready_at: datetime | None = None
+    delayed_to: datetime | None = None
+
+    def __post_init__(self):
+        _make_aware(self, 'client_timestamp', 'ready_at', 'delayed_to')
+
+
+class SyncRequest(LocationRequest):
+    operations: list[SyncOperationRequest] = []
+    # Omitted by clients that haven't synced yet, which get no delta
+    cursor: Annotated[int, msgspec.Meta(ge=0, le=2**63 - 1)] | None = None
+
+
+_decoders = {}
+
+
+def _decoder(schema):
+    """Get the precompiled JSON decoder for a schema."""
+    if schema not in _decoders:
+        _decoders[schema] = msgspec.json.Decoder(schema)
+    return _decoders[schema]
+
+
+def parse_body(schema, body: bytes):
+    """Decode a JSON request body straight into an instance of `schema`."""
+    try:
+        return _decoder(schema).decode(body)
+    except msgspec.ValidationError as e:
+        raise SchemaError(str(e))
+    except msgspec.DecodeError:
+        raise SchemaError('Invalid JSON')
+
+
+def parse_query(schema, query):
+    """Convert query parameters (all strings) into an instance of `schema`."""
+    try:
+        return msgspec.convert(query.dict(), schema, strict=False)
+    except msgspec.ValidationError as e:
+        raise SchemaError(str(e))
+
+
+def _validated_view(schema, parse, source):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                data = parse(schema, source(request))
+            except SchemaError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+            try:
+                return view(request, data, *args, **kwargs)
+            except NotFound as e:
+                return JsonResponse({'error': str(e)}, status=404)
+        return wrapper
+    return decorator
+
+
+def validate_body(schema):
+    """
+    Decorator that parses the request body into `schema` before the view runs.
+
+    The view is called as `view(request, data)`. Malformed input is rejected
+    with a 400 before any database access, and `NotFound` raised by the view
+    becomes a 404.
+    """
+    _decoder(schema)
+    return _validated_view(schema, parse_body, lambda request: request.body)
+
+
+def validate_query(schema):
+    """Like `validate_body`, for GET endpoints taking query parameters."""
+    return _validated_view(schema, parse_query, lambda request: request.GET)
+
+
+def get_or_404(queryset, **lookup):
+    """
+    Get a single object from a model or queryset, raising `NotFound` with a
+    uniform message if it doesn't exist.
+    """
+    queryset = getattr(queryset, '_default_manager', queryset)
+    try:
+        return queryset.get(**lookup)
+    except queryset.model.DoesNotExist:
+        raise NotFound(f'{queryset.model.__name__} not found')
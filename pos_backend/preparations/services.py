@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import Preparation, Item
+
+# Each change runs in one transaction with the events its save signals append,
+# so a failed event append rolls the change back instead of losing the event.
+
+
+def accept_preparation(preparation: Preparation, ready_at, at=None):
+    with transaction.atomic(using=preparation._state.db):
+        preparation.accepted_at = at or timezone.now()
+        preparation.ready_at = ready_at
+        preparation.save()
+    return preparation
+
+
+def reject_preparation(preparation: Preparation, at=None):
+    with transaction.atomic(using=preparation._state.db):
+        preparation.rejected_at = at or timezone.now()
+        preparation.save()
+    return preparation
+
+
+def cancel_preparation(preparation: Preparation, at=None, by_customer=False):
+    with transaction.atomic(using=preparation._state.db):
+        preparation.cancelled_at = at or timezone.now()
+        if by_customer:
+            preparation.cancelled_by_customer = True
+        preparation.save()
+    return preparation
+
+
+def delay_preparation(preparation: Preparation, delayed_to):
+    with transaction.atomic(using=preparation._state.db):
+        preparation.delayed_to = delayed_to
+        preparation.save()
+    return preparation
+
+
+def complete_item(item: Item, at=None):
+    """
+    Mark an item as completed.
+    When all items in the preparation are completed, the preparation is also marked as completed.
+
+    Returns True if this completed the preparation.
+    """
+    with transaction.atomic(using=item._state.db):
+        item.completed_at = at or timezone.now()
+        item.save()
+
+        preparation = item.preparation
+        if preparation.all_items_completed() and not preparation.completed_at:
+            preparation.completed_at = at or timezone.now()
+            preparation.save()
+            return True
+    return False
@@ -1,9 +1,11 @@
 import logging
-import requests
 from django.conf import settings
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import Preparation
+from .events import record_event
+from .models import Preparation, Item
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,9 @@ TRACKED_FIELDS = [
     'completed_at',
 ]
 
+# Fields recorded in the event log on top of TRACKED_FIELDS
+LOGGED_FIELDS = TRACKED_FIELDS + ['cancelled_by_customer']
+
 
 def get_webhook_url():
     """Get webhook URL from settings."""
@@ -47,8 +52,12 @@ def send_webhook(event_type: str, preparation: Preparation, changed_fields: list
         logger.debug("No webhook URL configured, skipping notification")
         return
 
+    # Imported lazily so workers without a webhook never pay for loading requests
+    import requests
+
     payload = {
         'event': event_type,
+        'location': preparation.location,
         'preparation_id': preparation.id,
         'order_id': preparation.order_id,
         'changed_fields': changed_fields,
@@ -77,15 +86,59 @@ def send_webhook(event_type: str, preparation: Preparation, changed_fields: list
         logger.error(f"{RED}✗ Webhook failed:{RESET} {e}")
 
 
+def get_event_type(instance: Preparation, changed_fields: list):
+    """Determine event type based on what changed."""
+    if 'completed_at' in changed_fields and instance.completed_at:
+        return 'preparation.completed'
+    elif 'delayed_to' in changed_fields and instance.delayed_to:
+        return 'preparation.delayed'
+    elif 'cancelled_at' in changed_fields and instance.cancelled_at:
+        return 'preparation.cancelled'
+    elif 'rejected_at' in changed_fields and instance.rejected_at:
+        return 'preparation.rejected'
+    elif 'accepted_at' in changed_fields and instance.accepted_at:
+        return 'preparation.accepted'
+    return 'preparation.updated'
+
+
+def dispatch_change(instance: Preparation, changed_fields: list, logged_fields: list = None):
+    """
+    Record the event and send the webhook for a change to a preparation.
+
+    Called from post_save, and directly after set-based updates
+    (e.g. admin bulk actions) which bypass the save signals. The webhook is
+    sent once the transaction commits, so a change that is rolled back is
+    never announced.
+    """
+    if logged_fields is None:
+        logged_fields = changed_fields
+
+    event_type = get_event_type(instance, changed_fields)
+    record_event(instance, event_type, {
+        field: getattr(instance, field)
+        for field in logged_fields
+    })
+
+    if not changed_fields:
+        logger.debug("No tracked fields changed, skipping webhook")
+        return
+
+    logger.info(f"Event '{event_type}' triggered for {instance.order_id}, changed fields: {changed_fields}")
+    transaction.on_commit(
+        lambda: send_webhook(event_type, instance, changed_fields),
+        using=instance._state.db,
+    )
+
+
 @receiver(pre_save, sender=Preparation)
-def preparation_pre_save(sender, instance, **kwargs):
+def preparation_pre_save(sender, instance, using, **kwargs):
     """Store original field values before save."""
     if instance.pk:
         try:
-            original = Preparation.objects.get(pk=instance.pk)
+            original = Preparation.objects.using(using).get(pk=instance.pk)
             instance._original_values = {
                 field: getattr(original, field)
-                for field in TRACKED_FIELDS
+                for field in LOGGED_FIELDS
             }
         except Preparation.DoesNotExist:
             instance._original_values = {}
@@ -95,11 +148,15 @@ def preparation_pre_save(sender, instance, **kwargs):
 
 @receiver(post_save, sender=Preparation)
 def preparation_post_save(sender, instance, created, **kwargs):
-    """Send webhook when tracked fields change."""
+    """Record lifecycle events and send webhook when tracked fields change."""
     logger.debug(f"post_save signal fired for Preparation {instance.pk} (created={created})")
 
     if created:
         logger.info(f"New preparation created: {instance.order_id}")
+        record_event(instance, 'preparation.created', {
+            field: getattr(instance, field)
+            for field in ['location', 'order_id', 'created_at'] + LOGGED_FIELDS
+        })
         return
 
     original_values = getattr(instance, '_original_values', {})
@@ -113,23 +170,52 @@ def preparation_post_save(sender, instance, created, **kwargs):
             changed_fields.append(field)
             logger.debug(f"Field '{field}' changed: {original_value} -> {current_value}")
 
-    if not changed_fields:
-        logger.debug("No tracked fields changed, skipping webhook")
+    logged_fields = list(changed_fields)
+    if original_values.get('cancelled_by_customer', False) != instance.cancelled_by_customer:
+        logged_fields.append('cancelled_by_customer')
+
+    if not logged_fields:
+        logger.debug("No logged fields changed, skipping event")
         return
 
-    # Determine event type based on what changed
-    if 'completed_at' in changed_fields and instance.completed_at:
-        event_type = 'preparation.completed'
-    elif 'delayed_to' in changed_fields and instance.delayed_to:
-        event_type = 'preparation.delayed'
-    elif 'cancelled_at' in changed_fields and instance.cancelled_at:
-        event_type = 'preparation.cancelled'
-    elif 'rejected_at' in changed_fields and instance.rejected_at:
-        event_type = 'preparation.rejected'
-    elif 'accepted_at' in changed_fields and instance.accepted_at:
-        event_type = 'preparation.accepted'
-    else:
-        event_type = 'preparation.updated'
+    dispatch_change(instance, changed_fields, logged_fields)
 
-    logger.info(f"Event '{event_type}' triggered for {instance.order_id}, changed fields: {changed_fields}")
-    send_webhook(event_type, instance, changed_fields)
+
+@receiver(pre_save, sender=Item)
+def item_pre_save(sender, instance, using, **kwargs):
+    """Store original completion time before save."""
+    instance._original_completed_at = None
+    if instance.pk:
+        instance._original_completed_at = (
+            Item.objects.using(using).filter(pk=instance.pk)
+            .values_list('completed_at', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Item)
+def item_post_save(sender, instance, created, **kwargs):
+    """Record item additions and completions in the preparation's event log."""
+    if created:
+        record_event(instance.preparation, 'item.added', {
+            'name': instance.name,
+            'quantity': instance.quantity,
+            'notes': instance.notes,
+            'completed_at': instance.completed_at,
+        }, item=instance)
+        return
+
+    if getattr(instance, '_original_completed_at', None) != instance.completed_at:
+        event_type = 'item.completed' if instance.completed_at else 'item.reopened'
+        record_event(instance.preparation, event_type, {
+            'completed_at': instance.completed_at,
+        }, item=instance)
+
+
+@receiver(post_delete, sender=Item)
+def item_post_delete(sender, instance, origin, **kwargs):
+    """Record item removals, so deleting an item doesn't rewrite the event log."""
+    # Deleting the preparation takes its whole log with it
+    if isinstance(origin, Preparation) or (isinstance(origin, QuerySet) and origin.model is Preparation):
+        return
+    record_event(instance.preparation, 'item.removed', {}, item=instance)
@@ -0,0 +1,175 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from . import services
+from .models import Preparation, Item, PreparationEvent, SyncOperation
+from .routers import database_for_location
+from .schemas import SYNC_OPERATION_TYPES, SyncOperationRequest
+
+# Result statuses
+APPLIED = 'applied'
+UNCHANGED = 'unchanged'
+CONFLICT = 'conflict'
+REJECTED = 'rejected'
+
+# Timestamps a replayed operation can't be dated before
+LIFECYCLE_FIELDS = ['created_at', 'accepted_at', 'rejected_at', 'cancelled_at', 'completed_at']
+
+
+def _result(op: SyncOperationRequest, status: str, **extra):
+    return {'operation_id': op.operation_id, 'status': status, **extra}
+
+
+def _find_conflict(op: SyncOperationRequest, preparation: Preparation):
+    """
+    Check a queued operation against changes that happened while the client was offline.
+
+    Returns `(status, message)` when the operation should not be applied, or None.
+    """
+    if preparation.cancelled_at:
+        if op.type == 'cancel_preparation':
+            return UNCHANGED, 'Preparation already cancelled'
+        if preparation.cancelled_by_customer:
+            return CONFLICT, 'Preparation was cancelled by the customer'
+        return CONFLICT, 'Preparation was cancelled'
+
+    if preparation.rejected_at:
+        if op.type == 'reject_preparation':
+            return UNCHANGED, 'Preparation already rejected'
+        return CONFLICT, 'Preparation was rejected'
+
+    if preparation.completed_at and op.type != 'complete_item':
+        return CONFLICT, 'Preparation is already completed'
+
+    if op.type == 'accept_preparation' and preparation.accepted_at:
+        return UNCHANGED, 'Preparation already accepted'
+
+    if op.type == 'delay_preparation' and op.delayed_to is not None and op.delayed_to == preparation.delayed_to:
+        return UNCHANGED, 'Preparation already delayed to that time'
+
+    return None
+
+
+def _operation_time(op: SyncOperationRequest, preparation: Preparation):
+    """
+    Get the time to record for an operation.
+
+    Client clocks can be off in either direction, so the client timestamp is
+    kept between the preparation's latest lifecycle change and now. Events
+    replayed later then never appear to happen before the preparation was
+    created or accepted, or in the future.
+    """
+    earliest = max(
+        timestamp
+        for timestamp in (getattr(preparation, field) for field in LIFECYCLE_FIELDS)
+        if timestamp is not None
+    )
+    return min(max(op.client_timestamp, earliest), timezone.now())
+
+
+def _apply(location: str, op: SyncOperationRequest):
+    if op.type not in SYNC_OPERATION_TYPES:
+        return _result(op, REJECTED, error=f'Unknown operation type: {op.type}')
+
+    if op.type == 'complete_item':
+        if op.item_id is None:
+            return _result(op, REJECTED, error="Missing field: 'item_id'")
+        item = Item.objects.for_location(location).select_related('preparation').filter(id=op.item_id).first()
+        if item is None:
+            return _result(op, REJECTED, error='Item not found')
+        preparation = item.preparation
+    else:
+        if op.preparation_id is None:
+            return _result(op, REJECTED, error="Missing field: 'preparation_id'")
+        preparation = Preparation.objects.for_location(location).filter(id=op.preparation_id).first()
+        if preparation is None:
+            return _result(op, REJECTED, error='Preparation not found')
+
+    conflict = _find_conflict(op, preparation)
+    if conflict:
+        status, message = conflict
+        return _result(op, status, preparation_id=preparation.id, error=message)
+
+    at = _operation_time(op, preparation)
+    if op.type == 'complete_item':
+        if item.completed_at:
+            return _result(op, UNCHANGED, preparation_id=preparation.id, error='Item already completed')
+        services.complete_item(item, at)
+    elif op.type == 'accept_preparation':
+        if op.ready_at is None:
+            return _result(op, REJECTED, error="Missing field: 'ready_at'")
+        services.accept_preparation(preparation, op.ready_at, at)
+    elif op.type == 'reject_preparation':
+        services.reject_preparation(preparation, at)
+    elif op.type == 'cancel_preparation':
+        services.cancel_preparation(preparation, at)
+    elif op.type == 'delay_preparation':
+        if op.delayed_to is None:
+            return _result(op, REJECTED, error="Missing field: 'delayed_to'")
+        services.delay_preparation(preparation, op.delayed_to)
+
+    return _result(op, APPLIED, preparation_id=preparation.id)
+
+
+def apply_operation(location: str, op: SyncOperationRequest):
+    """
+    Apply a single client operation, at most once per `operation_id`.
+
+    Retrying an operation that was already applied returns the stored result
+    without touching the preparation again.
+    """
+    db = database_for_location(location)
+    existing = SyncOperation.objects.using(db).filter(location=location, operation_id=op.operation_id).first()
+    if existing:
+        return existing.result
+
+    try:
+        with transaction.atomic(using=db):
+            result = _apply(location, op)
+            SyncOperation.objects.using(db).create(
+                location=location,
+                operation_id=op.operation_id,
+                operation_type=op.type,
+                client_timestamp=op.client_timestamp,
+                status=result['status'],
+                result=result,
+            )
+    except IntegrityError:
+        # A concurrent request applied the same operation first. Anything
+        # else is a real error.
+        existing = SyncOperation.objects.using(db).filter(location=location, operation_id=op.operation_id).first()
+        if existing is None:
+            raise
+        return existing.result
+
+    return result
+
+
+def apply_operations(location: str, operations: list):
+    """Apply a batch of client operations in the order they were queued."""
+    return [apply_operation(location, op) for op in operations]
+
+
+def _location_events(location: str):
+    return PreparationEvent.objects.using(database_for_location(location)).filter(
+        preparation__location=location
+    )
+
+
+def current_cursor(location: str):
+    """Get the id of the latest event of a location, for a client to sync from."""
+    return _location_events(location).aggregate(last=Max('id'))['last'] or 0
+
+
+def changes_since(location: str, cursor: int):
+    """
+    Get the preparations of a location that changed after `cursor`.
+
+    The cursor is the id of the last event the client has seen.
+    Returns `(new_cursor, preparations)`.
+    """
+    # Read the new cursor first so events written meanwhile are picked up next sync
+    new_cursor = current_cursor(location)
+    changed = _location_events(location).filter(id__gt=cursor, id__lte=new_cursor).values('preparation_id')
+    preparations = Preparation.objects.for_location(location).filter(id__in=changed).prefetch_related('items')
+    return new_cursor, preparations
@@ -1,3 +1,649 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+from unittest import mock, skipUnless
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Max
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from .events import rebuild_state
+from .models import Item, Preparation, PreparationEvent, PreparationSnapshot, SyncOperation
 
-# Create your tests here.
+
+# The api settings profile runs without the admin and auth apps
+ADMIN_INSTALLED = apps.is_installed('django.contrib.admin')
+
+
+class PreparationTestCase(TestCase):
+    """Helpers shared by the preparation API tests."""
+
+    def login_admin(self):
+        from django.contrib.auth.models import User
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+    def post(self, path, payload):
+        return self.client.post(
+            f'/api/preparations/{path}',
+            json.dumps(payload),
+            content_type='application/json',
+        )
+
+    def create_preparation(self, order_id='ORD-1', items=('Burger', 'Fries'), **extra):
+        response = self.post('webhook/preparation_created/', {
+            'order_id': order_id,
+            'items': [{'name': name} for name in items],
+            **extra,
+        })
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        return Preparation.objects.for_location(data['location']).get(id=data['preparation_id'])
+
+
+@override_settings(PREPARATION_SNAPSHOT_INTERVAL=3)
+class EventLogTests(PreparationTestCase):
+
+    def test_every_change_is_appended_in_sequence(self):
+        preparation = self.create_preparation()
+        self.post('accept_preparation/', {'preparation_id': preparation.id, 'ready_at': '2025-12-17T17:00:00Z'})
+        self.post('delay_preparation/', {'preparation_id': preparation.id, 'delayed_to': '2025-12-17T18:00:00Z'})
+        self.post('delay_preparation/', {'preparation_id': preparation.id, 'delayed_to': '2025-12-17T18:30:00Z'})
+
+        events = list(preparation.events.values_list('sequence', 'event_type'))
+        self.assertEqual(events, [
+            (1, 'preparation.created'),
+            (2, 'item.added'),
+            (3, 'item.added'),
+            (4, 'preparation.accepted'),
+            (5, 'preparation.delayed'),
+            (6, 'preparation.delayed'),
+        ])
+        # Both delays are kept, not just the latest
+        delays = preparation.events.filter(event_type='preparation.delayed').values_list('data', flat=True)
+        self.assertEqual([d['delayed_to'] for d in delays], ['2025-12-17T18:00:00+00:00', '2025-12-17T18:30:00+00:00'])
+
+    def test_replay_matches_current_state(self):
+        preparation = self.create_preparation()
+        self.post('accept_preparation/', {'preparation_id': preparation.id, 'ready_at': '2025-12-17T17:00:00Z'})
+        for item in preparation.items.all():
+            self.post('complete_item/', {'item_id': item.id})
+
+        preparation.refresh_from_db()
+        state = rebuild_state(preparation)
+        self.assertEqual(state['completed_at'], preparation.completed_at.isoformat())
+        self.assertEqual(state['accepted_at'], preparation.accepted_at.isoformat())
+        for item in preparation.items.all():
+            self.assertEqual(state['items'][str(item.id)]['completed_at'], item.completed_at.isoformat())
+
+    def test_snapshots_are_taken_every_interval(self):
+        preparation = self.create_preparation()
+        self.assertEqual(list(preparation.snapshots.values_list('sequence', flat=True)), [3])
+
+        for item in preparation.items.all():
+            self.post('complete_item/', {'item_id': item.id})
+        # 3 events at creation, 2 item completions and the preparation completion
+        self.assertEqual(list(preparation.snapshots.values_list('sequence', flat=True)), [3, 6])
+
+    def test_rebuild_from_snapshot_equals_full_replay(self):
+        preparation = self.create_preparation(items=('A', 'B', 'C', 'D'))
+        self.post('accept_preparation/', {'preparation_id': preparation.id, 'ready_at': '2025-12-17T17:00:00Z'})
+
+        from_snapshot = rebuild_state(preparation)
+        PreparationSnapshot.objects.filter(preparation=preparation).delete()
+        self.assertEqual(rebuild_state(preparation), from_snapshot)
+
+    def test_deleting_an_item_keeps_the_log(self):
+        preparation = self.create_preparation(items=('A', 'B'))
+        removed = preparation.items.get(name='A')
+        self.post('complete_item/', {'item_id': removed.id})
+        removed.delete()
+
+        self.assertEqual(
+            list(preparation.events.values_list('sequence', 'event_type')),
+            [(1, 'preparation.created'), (2, 'item.added'), (3, 'item.added'),
+             (4, 'item.completed'), (5, 'item.removed')],
+        )
+        # The snapshot at sequence 3 still has the item; replay drops it
+        from_snapshot = rebuild_state(preparation)
+        self.assertNotIn(str(removed.id), from_snapshot['items'])
+        PreparationSnapshot.objects.filter(preparation=preparation).delete()
+        self.assertEqual(rebuild_state(preparation), from_snapshot)
+
+    def test_deleting_a_preparation_deletes_its_log(self):
+        preparation = self.create_preparation()
+        preparation.delete()
+        self.assertFalse(PreparationEvent.objects.exists())
+
+    def test_time_travel(self):
+        preparation = self.create_preparation()
+        before_accept = timezone.now()
+        self.post('accept_preparation/', {'preparation_id': preparation.id, 'ready_at': '2025-12-17T17:00:00Z'})
+
+        past = rebuild_state(preparation, before_accept)
+        self.assertIsNone(past['accepted_at'])
+        self.assertIsNotNone(rebuild_state(preparation)['accepted_at'])
+
+    def test_time_travel_before_a_snapshot(self):
+        preparation = self.create_preparation(items=('A',))
+        before_snapshot = timezone.now()
+        self.post('accept_preparation/', {'preparation_id': preparation.id, 'ready_at': '2025-12-17T17:00:00Z'})
+        self.assertTrue(preparation.snapshots.filter(recorded_at__gt=before_snapshot).exists())
+
+        past = rebuild_state(preparation, before_snapshot)
+        self.assertIsNone(past['accepted_at'])
+        self.assertEqual(len(past['items']), 1)
+
+
+class HistoryEndpointTests(PreparationTestCase):
+
+    def test_history_returns_events_and_state(self):
+        preparation = self.create_preparation()
+        self.post('reject_preparation/', {'preparation_id': preparation.id})
+
+        response = self.client.get('/api/preparations/history/', {'order_id': 'ORD-1'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['events'][-1]['event_type'], 'preparation.rejected')
+        self.assertIsNotNone(data['state']['rejected_at'])
+
+    def test_history_at_a_point_in_time(self):
+        self.create_preparation()
+        response = self.client.get('/api/preparations/history/', {'order_id': 'ORD-1', 'at': '2000-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['events'], [])
+
+    def test_history_rejects_invalid_timestamps(self):
+        self.create_preparation()
+        for value in ['nope', '2000-13-01T00:00:00']:
+            response = self.client.get('/api/preparations/history/', {'order_id': 'ORD-1', 'at': value})
+            self.assertEqual(response.status_code, 400)
+
+    def test_history_accepts_naive_timestamps(self):
+        self.create_preparation()
+        response = self.client.get('/api/preparations/history/', {'order_id': 'ORD-1', 'at': '2100-01-01T00:00:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['at'], '2100-01-01T00:00:00Z')
+
+    def test_history_unknown_order(self):
+        response = self.client.get('/api/preparations/history/', {'order_id': 'missing'})
+        self.assertEqual(response.status_code, 404)
+
+
+class SchemaTests(PreparationTestCase):
+
+    def test_bounds_are_enforced(self):
+        invalid = [
+            {'order_id': '', 'items': []},
+            {'order_id': 'O' * 101, 'items': []},
+            {'order_id': 'ORD-1', 'items': [{'name': ''}]},
+            {'order_id': 'ORD-1', 'items': [{'name': 'N' * 256}]},
+            {'order_id': 'ORD-1', 'items': [{'name': 'Burger', 'quantity': 0}]},
+            {'order_id': 'ORD-1', 'items': [{'name': 'Burger', 'quantity': '2'}]},
+            {'order_id': 'ORD-1', 'location': ''},
+        ]
+        for payload in invalid:
+            response = self.post('webhook/preparation_created/', payload)
+            self.assertEqual(response.status_code, 400, payload)
+        self.assertFalse(Preparation.objects.exists())
+
+    def test_integers_must_fit_their_columns(self):
+        response = self.post('webhook/preparation_created/', {
+            'order_id': 'ORD-1', 'items': [{'name': 'Burger', 'quantity': 2**63}],
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.post('webhook/preparation_created/', {
+            'order_id': 'ORD-1', 'items': [{'name': 'Burger', 'quantity': 2**31}],
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.post('reject_preparation/', {'preparation_id': 2**31})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Preparation.objects.exists())
+
+    def test_datetimes_out_of_range_are_rejected(self):
+        preparation = self.create_preparation()
+        for value in ['0001-01-01T00:00:00+05:00', '9999-12-31T23:00:00-05:00', '1900-01-01T00:00:00Z']:
+            response = self.post('delay_preparation/', {'preparation_id': preparation.id, 'delayed_to': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('delayed_to', response.json()['error'])
+        response = self.client.get('/api/preparations/history/', {'order_id': 'ORD-1', 'at': '0001-01-01T00:00:00+05:00'})
+        self.assertEqual(response.status_code, 400)
+        preparation.refresh_from_db()
+        self.assertIsNone(preparation.delayed_to)
+
+    def test_invalid_ids_are_rejected_before_the_lookup(self):
+        for value in [0, -1, 'one', None]:
+            response = self.post('reject_preparation/', {'preparation_id': value})
+            self.assertEqual(response.status_code, 400, value)
+
+    def test_malformed_bodies(self):
+        response = self.client.post(
+            '/api/preparations/reject_preparation/', 'not json', content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'error': 'Invalid JSON'})
+        response = self.post('reject_preparation/', {})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('preparation_id', response.json()['error'])
+
+    def test_naive_datetimes_are_made_aware(self):
+        preparation = self.create_preparation()
+        self.post('accept_preparation/', {'preparation_id': preparation.id, 'ready_at': '2025-12-17T17:00:00'})
+        preparation.refresh_from_db()
+        self.assertEqual(preparation.ready_at.isoformat(), '2025-12-17T17:00:00+00:00')
+
+    def test_unknown_preparation_is_404(self):
+        response = self.post('reject_preparation/', {'preparation_id': 999})
+        self.assertEqual(response.status_code, 404)
+
+    def test_duplicate_order_is_409(self):
+        self.create_preparation('ORD-1', items=('A',))
+        response = self.post('webhook/preparation_created/', {'order_id': 'ORD-1', 'items': [{'name': 'B'}]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Preparation.objects.count(), 1)
+        self.assertEqual(list(Preparation.objects.get().items.values_list('name', flat=True)), ['A'])
+
+    def test_failed_item_rolls_back_the_preparation(self):
+        with mock.patch.object(Item, 'save', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post('webhook/preparation_created/', {'order_id': 'ORD-1', 'items': [{'name': 'A'}]})
+        self.assertFalse(Preparation.objects.exists())
+        self.assertFalse(PreparationEvent.objects.exists())
+
+    def test_history_query_is_validated(self):
+        response = self.client.get('/api/preparations/history/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('order_id', response.json()['error'])
+
+
+class SyncTests(PreparationTestCase):
+
+    def sync(self, *operations, **extra):
+        response = self.post('sync/', {'operations': list(operations), **extra})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def operation(self, operation_id, type, client_timestamp='2025-12-17T17:00:00Z', **fields):
+        return {'operation_id': operation_id, 'type': type, 'client_timestamp': client_timestamp, **fields}
+
+    def test_replaying_an_operation_applies_it_once(self):
+        preparation = self.create_preparation()
+        op = self.operation('op-1', 'delay_preparation', preparation_id=preparation.id, delayed_to='2025-12-17T18:00:00Z')
+
+        first = self.sync(op)['results']
+        self.assertEqual(first[0]['status'], 'applied')
+        self.post('delay_preparation/', {'preparation_id': preparation.id, 'delayed_to': '2025-12-17T19:00:00Z'})
+        self.assertEqual(self.sync(op)['results'], first)
+
+        preparation.refresh_from_db()
+        self.assertEqual(preparation.delayed_to.isoformat(), '2025-12-17T19:00:00+00:00')
+        self.assertEqual(preparation.events.filter(event_type='preparation.delayed').count(), 2)
+
+    def test_completing_an_item_of_a_cancelled_order_conflicts(self):
+        preparation = self.create_preparation()
+        self.post('webhook/order_cancelled/', {'order_id': preparation.order_id})
+        item = preparation.items.first()
+
+        result = self.sync(self.operation('op-1', 'complete_item', item_id=item.id))['results'][0]
+        self.assertEqual(result['status'], 'conflict')
+        self.assertEqual(result['error'], 'Preparation was cancelled by the customer')
+        item.refresh_from_db()
+        self.assertIsNone(item.completed_at)
+
+    def test_repeated_accept_and_delay_are_unchanged(self):
+        preparation = self.create_preparation()
+        self.post('accept_preparation/', {'preparation_id': preparation.id, 'ready_at': '2025-12-17T17:00:00Z'})
+        self.post('delay_preparation/', {'preparation_id': preparation.id, 'delayed_to': '2025-12-17T18:00:00Z'})
+        events = preparation.events.count()
+
+        results = self.sync(
+            self.operation('op-1', 'accept_preparation', preparation_id=preparation.id, ready_at='2025-12-17T17:30:00Z'),
+            self.operation('op-2', 'delay_preparation', preparation_id=preparation.id, delayed_to='2025-12-17T18:00:00Z'),
+        )['results']
+        self.assertEqual([r['status'] for r in results], ['unchanged', 'unchanged'])
+        self.assertEqual(preparation.events.count(), events)
+
+    def test_operation_time_is_clamped_to_the_lifecycle(self):
+        preparation = self.create_preparation()
+        self.sync(self.operation('op-1', 'accept_preparation', '2000-01-01T00:00:00Z',
+                                 preparation_id=preparation.id, ready_at='2025-12-17T17:00:00Z'))
+        preparation.refresh_from_db()
+        self.assertEqual(preparation.accepted_at, preparation.created_at)
+
+        before = timezone.now()
+        self.sync(self.operation('op-2', 'reject_preparation', '2100-01-01T00:00:00Z', preparation_id=preparation.id))
+        preparation.refresh_from_db()
+        self.assertGreaterEqual(preparation.rejected_at, before)
+        self.assertLessEqual(preparation.rejected_at, timezone.now())
+
+    def test_unknown_operations_are_rejected_individually(self):
+        preparation = self.create_preparation()
+        results = self.sync(
+            self.operation('op-1', 'explode', preparation_id=preparation.id),
+            self.operation('op-2', 'reject_preparation', preparation_id=preparation.id),
+        )['results']
+        self.assertEqual([r['status'] for r in results], ['rejected', 'applied'])
+
+    def test_cursor_returns_only_what_changed(self):
+        first = self.create_preparation('ORD-1')
+        second = self.create_preparation('ORD-2')
+
+        data = self.sync()
+        self.assertNotIn('preparations', data)
+        cursor = data['cursor']
+        self.assertEqual(cursor, PreparationEvent.objects.aggregate(Max('id'))['id__max'])
+
+        self.post('reject_preparation/', {'preparation_id': second.id})
+        data = self.sync(cursor=cursor)
+        self.assertEqual([p['id'] for p in data['preparations']], [second.id])
+        self.assertGreater(data['cursor'], cursor)
+
+        data = self.sync(self.operation('op-1', 'cancel_preparation', preparation_id=first.id), cursor=data['cursor'])
+        self.assertEqual([p['id'] for p in data['preparations']], [first.id])
+        self.assertIsNotNone(data['preparations'][0]['cancelled_at'])
+
+    def test_cursor_from_the_list_only_returns_later_changes(self):
+        self.create_preparation('ORD-1')
+        second = self.create_preparation('ORD-2')
+        response = self.client.get('/api/preparations/')
+        cursor = int(response['X-Sync-Cursor'])
+        self.assertEqual(cursor, PreparationEvent.objects.aggregate(Max('id'))['id__max'])
+
+        self.assertEqual(self.sync(cursor=cursor)['preparations'], [])
+        self.post('accept_preparation/', {'preparation_id': second.id, 'ready_at': '2025-12-17T17:00:00Z'})
+        data = self.sync(cursor=cursor)
+        self.assertEqual([p['id'] for p in data['preparations']], [second.id])
+
+    def test_webhooks_are_sent_after_commit(self):
+        preparation = self.create_preparation()
+        with mock.patch('preparations.signals.send_webhook') as send_webhook:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                self.sync(self.operation('op-1', 'reject_preparation', preparation_id=preparation.id))
+                send_webhook.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+        send_webhook.assert_called_once()
+
+    def test_other_integrity_errors_are_not_swallowed(self):
+        preparation = self.create_preparation()
+        op = self.operation('op-1', 'reject_preparation', preparation_id=preparation.id)
+        with mock.patch('preparations.sync._apply', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.sync(op)
+        self.assertFalse(SyncOperation.objects.exists())
+
+
+@skipUnless(ADMIN_INSTALLED, 'the admin is not installed')
+class AdminTests(PreparationTestCase):
+
+    def setUp(self):
+        self.login_admin()
+
+    def changelist(self, **params):
+        response = self.client.get('/admin/preparations/preparation/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_status_filters(self):
+        incoming = self.create_preparation('ORD-1')
+        rejected = self.create_preparation('ORD-2')
+        self.post('reject_preparation/', {'preparation_id': rejected.id})
+
+        response = self.changelist(status='incoming')
+        self.assertEqual([p.id for p in response.context['cl'].result_list], [incoming.id])
+        response = self.changelist(status='rejected')
+        self.assertEqual([p.id for p in response.context['cl'].result_list], [rejected.id])
+
+    def test_search_by_order_id(self):
+        self.create_preparation('ORD-1')
+        self.create_preparation('ORD-2')
+        response = self.changelist(q='ORD-2')
+        self.assertEqual([p.order_id for p in response.context['cl'].result_list], ['ORD-2'])
+
+    def test_search_uses_the_order_id_index(self):
+        self.create_preparation('ORD-1')
+        plan = self.changelist(q='ORD-1').context['cl'].queryset.explain()
+        self.assertRegex(plan, r'USING (COVERING )?INDEX \w+ \((location=\? AND )?order_id=\?\)')
+
+        response = self.client.get('/admin/preparations/item/', {'q': 'ORD-1'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        plan = response.context['cl'].queryset.explain()
+        self.assertRegex(plan, r'USING (COVERING )?INDEX \w+ \(preparation_id=\?\)')
+
+    def test_item_counts(self):
+        self.create_preparation('ORD-1', items=('A', 'B', 'C'))
+        response = self.changelist()
+        self.assertEqual(response.context['cl'].result_list[0].item_count, 3)
+
+    def test_count_is_exact_below_the_limit(self):
+        for i in range(5):
+            self.create_preparation(f'ORD-{i}')
+        Preparation.objects.filter(order_id__in=['ORD-3', 'ORD-4']).delete()
+
+        paginator = self.changelist().context['cl'].paginator
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.is_estimate)
+
+    def test_count_is_capped_for_locations_sharing_a_database(self):
+        for i in range(5):
+            self.create_preparation(f'ORD-{i}')
+            self.create_preparation(f'ORD-{i}', location='bergen')
+
+        with mock.patch('preparations.admin.EstimatedCountPaginator.exact_count_limit', 2):
+            response = self.changelist()
+        paginator = response.context['cl'].paginator
+        self.assertTrue(paginator.is_estimate)
+        self.assertTrue(paginator.is_capped)
+        self.assertEqual(paginator.count, 3)
+        self.assertContains(response, '2+ preparations')
+        self.assertContains(response, 'The total is an estimate')
+
+    def test_count_is_estimated_for_a_location_with_its_own_database(self):
+        for i in range(5):
+            self.create_preparation(f'ORD-{i}')
+        Preparation.objects.filter(order_id='ORD-0').delete()
+
+        with mock.patch('preparations.admin.EstimatedCountPaginator.exact_count_limit', 2), \
+                mock.patch('preparations.admin.has_own_database', return_value=True):
+            response = self.changelist()
+            filtered = self.changelist(status='incoming').context['cl'].paginator
+        paginator = response.context['cl'].paginator
+        self.assertTrue(paginator.is_estimate)
+        self.assertFalse(paginator.is_capped)
+        self.assertEqual(paginator.count, Preparation.objects.aggregate(Max('pk'))['pk__max'])
+        # Filtered listings report what was counted instead of guessing
+        self.assertTrue(filtered.is_capped)
+        self.assertEqual(filtered.count, 3)
+
+    def test_bulk_reject_dispatches_events_and_webhooks(self):
+        first = self.create_preparation('ORD-1')
+        second = self.create_preparation('ORD-2')
+
+        with mock.patch('preparations.signals.send_webhook') as send_webhook:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/admin/preparations/preparation/', {
+                    'action': 'reject_preparations',
+                    '_selected_action': [first.id, second.id],
+                })
+
+        self.assertEqual(Preparation.objects.filter(rejected_at__isnull=False).count(), 2)
+        self.assertEqual(PreparationEvent.objects.filter(event_type='preparation.rejected').count(), 2)
+        self.assertEqual(send_webhook.call_count, 2)
+
+    def test_bulk_complete_completes_items(self):
+        preparation = self.create_preparation('ORD-1', items=('A', 'B'))
+        self.client.post('/admin/preparations/preparation/', {
+            'action': 'complete_preparations',
+            '_selected_action': [preparation.id],
+        })
+
+        preparation.refresh_from_db()
+        self.assertIsNotNone(preparation.completed_at)
+        self.assertTrue(preparation.all_items_completed())
+        state = rebuild_state(preparation)
+        self.assertTrue(all(item['completed_at'] for item in state['items'].values()))
+        self.assertIsNotNone(state['completed_at'])
+
+    def test_preparations_cannot_be_deleted(self):
+        preparation = self.create_preparation('ORD-1')
+        response = self.client.get(f'/admin/preparations/preparation/{preparation.id}/delete/')
+        self.assertEqual(response.status_code, 403)
+        actions = [name for name, _ in self.changelist().context['action_form'].fields['action'].choices]
+        self.assertNotIn('delete_selected', actions)
+
+    @override_settings(PREPARATION_LOCATION_DATABASES={'bergen': 'default'})
+    def test_listings_are_scoped_to_a_location(self):
+        oslo = self.create_preparation('ORD-1')
+        bergen = self.create_preparation('ORD-1', location='bergen')
+
+        response = self.changelist()
+        self.assertEqual([p.id for p in response.context['cl'].result_list], [oslo.id])
+        response = self.changelist(location='bergen')
+        self.assertEqual([p.id for p in response.context['cl'].result_list], [bergen.id])
+
+        response = self.client.get('/admin/preparations/item/', {'location': 'bergen'})
+        self.assertEqual({i.preparation_id for i in response.context['cl'].result_list}, {bergen.id})
+
+    @override_settings(PREPARATION_LOCATION_DATABASES={'bergen': 'default'})
+    def test_location_choices_come_from_settings(self):
+        self.create_preparation('ORD-1', location='stavanger')
+        response = self.changelist()
+        location_filter = response.context['cl'].filter_specs[0]
+        self.assertEqual([value for value, _ in location_filter.lookup_choices], ['default', 'bergen'])
+
+    def test_change_page_uses_the_preserved_location(self):
+        preparation = self.create_preparation('ORD-1', location='bergen')
+        url = f'/admin/preparations/preparation/{preparation.id}/change/'
+        self.assertEqual(self.client.get(url).status_code, 302)
+        response = self.client.get(url, {'_changelist_filters': 'location=bergen'})
+        self.assertEqual(response.status_code, 200)
+
+
+@skipUnless('oslo' in settings.DATABASES, 'needs a database for the oslo location')
+class LocationDatabaseTests(PreparationTestCase):
+    """
+    Locations mapped to their own database. Run through
+    LocationDatabaseSuiteTests, which configures the extra database.
+    """
+    # The runner sets up every alias named here, even for a skipped class
+    databases = {'default', 'oslo'}.intersection(settings.DATABASES)
+
+    def test_preparations_are_written_to_the_location_database(self):
+        preparation = self.create_preparation(location='oslo')
+        self.assertEqual(preparation._state.db, 'oslo')
+        self.assertFalse(Preparation.objects.using('default').exists())
+        self.assertEqual(Item.objects.using('oslo').filter(location='oslo').count(), 2)
+        self.assertEqual(PreparationEvent.objects.using('oslo').count(), 3)
+
+    def test_updates_and_events_stay_on_the_location_database(self):
+        preparation = self.create_preparation(location='oslo')
+        for item in preparation.items.all():
+            response = self.post('complete_item/', {'location': 'oslo', 'item_id': item.id})
+            self.assertEqual(response.status_code, 200)
+
+        preparation.refresh_from_db()
+        self.assertIsNotNone(preparation.completed_at)
+        self.assertIsNotNone(rebuild_state(preparation)['completed_at'])
+        self.assertFalse(PreparationEvent.objects.using('default').exists())
+
+    def test_other_locations_do_not_see_the_preparation(self):
+        preparation = self.create_preparation(location='oslo')
+        response = self.post('reject_preparation/', {'preparation_id': preparation.id})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/api/preparations/').json(), [])
+        response = self.client.get('/api/preparations/', {'location': 'oslo'})
+        self.assertEqual([p['id'] for p in response.json()], [preparation.id])
+
+    @skipUnless(ADMIN_INSTALLED, 'the admin is not installed')
+    def test_admin_reads_and_acts_on_the_location_database(self):
+        self.login_admin()
+        preparation = self.create_preparation(location='oslo')
+
+        response = self.client.get('/admin/preparations/preparation/', {'location': 'oslo'})
+        self.assertEqual([p.id for p in response.context['cl'].result_list], [preparation.id])
+        # The location has the database to itself, so MAX(pk) is a fair estimate
+        with mock.patch('preparations.admin.EstimatedCountPaginator.exact_count_limit', 0):
+            response = self.client.get('/admin/preparations/preparation/', {'location': 'oslo'})
+        self.assertFalse(response.context['cl'].paginator.is_capped)
+        self.assertEqual(response.context['cl'].paginator.count, preparation.id)
+        response = self.client.get(
+            f'/admin/preparations/preparation/{preparation.id}/change/',
+            {'_changelist_filters': 'location=oslo'},
+        )
+        self.assertEqual(len(response.context['inline_admin_formsets'][0].formset.queryset), 2)
+
+        self.client.post('/admin/preparations/preparation/?location=oslo', {
+            'action': 'reject_preparations',
+            '_selected_action': [preparation.id],
+        })
+        preparation.refresh_from_db()
+        self.assertIsNotNone(preparation.rejected_at)
+
+
+class LocationDatabaseSuiteTests(SimpleTestCase):
+    """DATABASES is read at startup, so the location database tests run in a fresh interpreter."""
+
+    def test_location_database(self):
+        env = dict(os.environ, PREPARATION_LOCATION_DATABASES=json.dumps({'oslo': 'oslo'}))
+        env.pop('PREPARATION_WEBHOOK_URL', None)
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'test', 'preparations.tests.LocationDatabaseTests', '-v', '2'],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn('needs a database for the oslo location', result.stderr)
+
+
+API_PROFILE_CHECK = """
+import sys
+import django
+django.setup()
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment
+
+setup_test_environment()
+runner = DiscoverRunner(verbosity=0)
+old_config = runner.setup_databases()
+try:
+    response = Client().get('/api/preparations/')
+    admin = Client().get('/admin/')
+finally:
+    runner.teardown_databases(old_config)
+
+assert response.status_code == 200, response.status_code
+assert admin.status_code == 404, admin.status_code
+assert 'requests' not in sys.modules, 'requests was imported'
+assert 'django.contrib.admin' not in sys.modules, 'the admin was imported'
+"""
+
+
+class SettingsProfileTests(SimpleTestCase):
+    """Settings are read at startup, so each profile runs in a fresh interpreter."""
+
+    def run_profile(self, profile, code):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='pos_backend.settings',
+            POS_SETTINGS_PROFILE=profile,
+        )
+        env.pop('PREPARATION_WEBHOOK_URL', None)
+        return subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+    def test_api_profile_serves_preparations_without_admin_or_requests(self):
+        result = self.run_profile('api', API_PROFILE_CHECK)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_unknown_profile_is_rejected(self):
+        result = self.run_profile('API', 'import django; django.setup()')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('ImproperlyConfigured', result.stderr)
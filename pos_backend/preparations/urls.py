@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.get_preparations, name='get_preparations'),
+    path('history/', views.preparation_history, name='preparation_history'),
+    path('sync/', views.sync, name='sync'),
     path('complete_item/', views.complete_item, name='complete_item'),
     path('accept_preparation/', views.accept_preparation, name='accept_preparation'),
     path('reject_preparation/', views.reject_preparation, name='reject_preparation'),
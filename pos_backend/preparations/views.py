@@ -1,37 +1,108 @@
-import json
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
+from . import services
+from .events import rebuild_state
 from .models import Preparation, Item
+from .routers import database_for_location
+from .sync import apply_operations, changes_since, current_cursor
+from .schemas import (
+    AcceptPreparationRequest,
+    DelayPreparationRequest,
+    HistoryRequest,
+    ItemIdRequest,
+    LocationRequest,
+    OrderRequest,
+    PreparationCreatedRequest,
+    PreparationIdRequest,
+    SyncRequest,
+    get_or_404,
+    validate_body,
+    validate_query,
+)
+
+
+def serialize_preparation(preparation: Preparation):
+    """Serialize a preparation with its items. Expects `items` to be prefetched."""
+    return {
+        'id': preparation.id,
+        'location': preparation.location,
+        'order_id': preparation.order_id,
+        'created_at': preparation.created_at,
+        'accepted_at': preparation.accepted_at,
+        'ready_at': preparation.ready_at,
+        'rejected_at': preparation.rejected_at,
+        'cancelled_at': preparation.cancelled_at,
+        'cancelled_by_customer': preparation.cancelled_by_customer,
+        'delayed_to': preparation.delayed_to,
+        'completed_at': preparation.completed_at,
+        'items': [
+            {
+                'id': item.id,
+                'name': item.name,
+                'quantity': item.quantity,
+                'notes': item.notes,
+                'completed_at': item.completed_at,
+            }
+            for item in preparation.items.all()
+        ]
+    }
 
 
-def get_preparations(request):
-    """Simple GET endpoint - returns all preparations with items as JSON"""
-    preparations = Preparation.objects.prefetch_related('items').all()
-
-    result = []
-    for preparation in preparations:
-        result.append({
-            'id': preparation.id,
-            'order_id': preparation.order_id,
-            'created_at': preparation.created_at,
-            'accepted_at': preparation.accepted_at,
-            'ready_at': preparation.ready_at,
-            'rejected_at': preparation.rejected_at,
-            'cancelled_at': preparation.cancelled_at,
-            'cancelled_by_customer': preparation.cancelled_by_customer,
-            'delayed_to': preparation.delayed_to,
-            'completed_at': preparation.completed_at,
-            'items': list(preparation.items.values('id', 'name', 'quantity', 'notes', 'completed_at'))
-        })
+@validate_query(LocationRequest)
+def get_preparations(request, data: LocationRequest):
+    """
+    Simple GET endpoint - returns all preparations of a location with items as JSON
+
+    The X-Sync-Cursor header has the sync cursor matching the list, so the
+    client can later ask the sync endpoint for only what changed after it.
+
+    Query parameters:
+        location: optional, defaults to PREPARATION_DEFAULT_LOCATION
+    """
+    # Read the cursor first so changes made meanwhile are in the next delta
+    cursor = current_cursor(data.location)
+    preparations = Preparation.objects.for_location(data.location).prefetch_related('items')
+
+    result = [serialize_preparation(preparation) for preparation in preparations]
 
-    return JsonResponse(result, safe=False)
+    response = JsonResponse(result, safe=False)
+    response['X-Sync-Cursor'] = cursor
+    return response
+
+
+@validate_query(HistoryRequest)
+def preparation_history(request, data: HistoryRequest):
+    """
+    GET endpoint returning the event log of a preparation and its state at a point in time.
+
+    Query parameters:
+        order_id: the order to look up
+        location: optional, defaults to PREPARATION_DEFAULT_LOCATION
+        at: optional ISO 8601 timestamp, defaults to now
+    """
+    at = data.at or timezone.now()
+    preparation = get_or_404(Preparation.objects.for_location(data.location), order_id=data.order_id)
+
+    events = preparation.events.filter(recorded_at__lte=at).order_by('sequence')
+
+    return JsonResponse({
+        'location': preparation.location,
+        'preparation_id': preparation.id,
+        'order_id': preparation.order_id,
+        'at': at,
+        'state': rebuild_state(preparation, at),
+        'events': list(events.values('sequence', 'event_type', 'item_id', 'data', 'recorded_at')),
+    })
 
 
 @csrf_exempt
 @require_POST
-def preparation_created(request):
+@validate_body(PreparationCreatedRequest)
+def preparation_created(request, data: PreparationCreatedRequest):
     """
     Webhook endpoint for receiving new preparations from external systems.
 
@@ -44,36 +115,35 @@ def preparation_created(request):
         ]
     }
     """
+    db = database_for_location(data.location)
     try:
-        data = json.loads(request.body)
-
-        preparation = Preparation.objects.create(
-            order_id=data['order_id']
-        )
-
-        for item_data in data.get('items', []):
-            Item.objects.create(
-                preparation=preparation,
-                name=item_data['name'],
-                quantity=item_data.get('quantity', 1),
-                notes=item_data.get('notes', '')
+        with transaction.atomic(using=db):
+            preparation = Preparation.objects.using(db).create(
+                location=data.location,
+                order_id=data.order_id
             )
 
-        return JsonResponse({
-            'status': 'success',
-            'preparation_id': preparation.id,
-            'order_id': preparation.order_id
-        }, status=201)
+            for item_data in data.items:
+                preparation.items.create(
+                    name=item_data.name,
+                    quantity=item_data.quantity,
+                    notes=item_data.notes
+                )
+    except IntegrityError:
+        return JsonResponse({'error': f'Preparation already exists for order {data.order_id}'}, status=409)
 
-    except KeyError as e:
-        return JsonResponse({'error': f'Missing field: {e}'}, status=400)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'location': preparation.location,
+        'preparation_id': preparation.id,
+        'order_id': preparation.order_id
+    }, status=201)
 
 
 @csrf_exempt
 @require_POST
-def order_cancelled(request):
+@validate_body(OrderRequest)
+def order_cancelled(request, data: OrderRequest):
     """
     Webhook endpoint for when a customer cancels an order.
 
@@ -82,34 +152,22 @@ def order_cancelled(request):
         "order_id": "ORD-12345"
     }
     """
-    try:
-        data = json.loads(request.body)
-        order_id = data['order_id']
-
-        preparation = Preparation.objects.get(order_id=order_id)
-        preparation.cancelled_at = timezone.now()
-        preparation.cancelled_by_customer = True
-        preparation.save()
-
-        return JsonResponse({
-            'status': 'success',
-            'order_id': preparation.order_id,
-            'preparation_id': preparation.id,
-            'cancelled_at': preparation.cancelled_at,
-            'cancelled_by_customer': preparation.cancelled_by_customer
-        })
+    preparation = get_or_404(Preparation.objects.for_location(data.location), order_id=data.order_id)
+    services.cancel_preparation(preparation, by_customer=True)
 
-    except Preparation.DoesNotExist:
-        return JsonResponse({'error': 'Preparation not found'}, status=404)
-    except KeyError as e:
-        return JsonResponse({'error': f'Missing field: {e}'}, status=400)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'order_id': preparation.order_id,
+        'preparation_id': preparation.id,
+        'cancelled_at': preparation.cancelled_at,
+        'cancelled_by_customer': preparation.cancelled_by_customer
+    })
 
 
 @csrf_exempt
 @require_POST
-def complete_item(request):
+@validate_body(ItemIdRequest)
+def complete_item(request, data: ItemIdRequest):
     """
     API endpoint for marking an item as completed.
     When all items in a preparation are completed, the preparation is also marked as completed.
@@ -119,43 +177,24 @@ def complete_item(request):
         "item_id": 3
     }
     """
-    try:
-        data = json.loads(request.body)
-        item_id = data['item_id']
+    item = get_or_404(Item.objects.for_location(data.location), id=data.item_id)
+    preparation_completed = services.complete_item(item)
+    preparation = item.preparation
 
-        item = Item.objects.get(id=item_id)
-        item.completed_at = timezone.now()
-        item.save()
-
-        preparation = item.preparation
-        preparation_completed = False
-
-        # Check if all items are now completed
-        if preparation.all_items_completed() and not preparation.completed_at:
-            preparation.completed_at = timezone.now()
-            preparation.save()
-            preparation_completed = True
-
-        return JsonResponse({
-            'status': 'success',
-            'item_id': item.id,
-            'preparation_id': preparation.id,
-            'completed_at': item.completed_at,
-            'preparation_completed': preparation_completed,
-            'preparation_completed_at': preparation.completed_at
-        })
-
-    except Item.DoesNotExist:
-        return JsonResponse({'error': 'Item not found'}, status=404)
-    except KeyError as e:
-        return JsonResponse({'error': f'Missing field: {e}'}, status=400)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'item_id': item.id,
+        'preparation_id': preparation.id,
+        'completed_at': item.completed_at,
+        'preparation_completed': preparation_completed,
+        'preparation_completed_at': preparation.completed_at
+    })
 
 
 @csrf_exempt
 @require_POST
-def accept_preparation(request):
+@validate_body(AcceptPreparationRequest)
+def accept_preparation(request, data: AcceptPreparationRequest):
     """
     API endpoint for accepting a preparation.
 
@@ -165,34 +204,21 @@ def accept_preparation(request):
         "ready_at": "2025-12-17T17:00:00Z"
     }
     """
-    try:
-        data = json.loads(request.body)
-        preparation_id = data['preparation_id']
-        ready_at = data['ready_at']
+    preparation = get_or_404(Preparation.objects.for_location(data.location), id=data.preparation_id)
+    services.accept_preparation(preparation, data.ready_at)
 
-        preparation = Preparation.objects.get(id=preparation_id)
-        preparation.accepted_at = timezone.now()
-        preparation.ready_at = ready_at
-        preparation.save()
-
-        return JsonResponse({
-            'status': 'success',
-            'preparation_id': preparation.id,
-            'accepted_at': preparation.accepted_at,
-            'ready_at': preparation.ready_at
-        })
-
-    except Preparation.DoesNotExist:
-        return JsonResponse({'error': 'Preparation not found'}, status=404)
-    except KeyError as e:
-        return JsonResponse({'error': f'Missing field: {e}'}, status=400)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'preparation_id': preparation.id,
+        'accepted_at': preparation.accepted_at,
+        'ready_at': preparation.ready_at
+    })
 
 
 @csrf_exempt
 @require_POST
-def reject_preparation(request):
+@validate_body(PreparationIdRequest)
+def reject_preparation(request, data: PreparationIdRequest):
     """
     API endpoint for rejecting a preparation.
 
@@ -201,31 +227,20 @@ def reject_preparation(request):
         "preparation_id": 1
     }
     """
-    try:
-        data = json.loads(request.body)
-        preparation_id = data['preparation_id']
-
-        preparation = Preparation.objects.get(id=preparation_id)
-        preparation.rejected_at = timezone.now()
-        preparation.save()
-
-        return JsonResponse({
-            'status': 'success',
-            'preparation_id': preparation.id,
-            'rejected_at': preparation.rejected_at
-        })
+    preparation = get_or_404(Preparation.objects.for_location(data.location), id=data.preparation_id)
+    services.reject_preparation(preparation)
 
-    except Preparation.DoesNotExist:
-        return JsonResponse({'error': 'Preparation not found'}, status=404)
-    except KeyError as e:
-        return JsonResponse({'error': f'Missing field: {e}'}, status=400)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'preparation_id': preparation.id,
+        'rejected_at': preparation.rejected_at
+    })
 
 
 @csrf_exempt
 @require_POST
-def cancel_preparation(request):
+@validate_body(PreparationIdRequest)
+def cancel_preparation(request, data: PreparationIdRequest):
     """
     API endpoint for cancelling a preparation (e.g., kitchen cancels an in-progress order).
 
@@ -234,31 +249,20 @@ def cancel_preparation(request):
         "preparation_id": 1
     }
     """
-    try:
-        data = json.loads(request.body)
-        preparation_id = data['preparation_id']
-
-        preparation = Preparation.objects.get(id=preparation_id)
-        preparation.cancelled_at = timezone.now()
-        preparation.save()
-
-        return JsonResponse({
-            'status': 'success',
-            'preparation_id': preparation.id,
-            'cancelled_at': preparation.cancelled_at
-        })
+    preparation = get_or_404(Preparation.objects.for_location(data.location), id=data.preparation_id)
+    services.cancel_preparation(preparation)
 
-    except Preparation.DoesNotExist:
-        return JsonResponse({'error': 'Preparation not found'}, status=404)
-    except KeyError as e:
-        return JsonResponse({'error': f'Missing field: {e}'}, status=400)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'preparation_id': preparation.id,
+        'cancelled_at': preparation.cancelled_at
+    })
 
 
 @csrf_exempt
 @require_POST
-def delay_preparation(request):
+@validate_body(DelayPreparationRequest)
+def delay_preparation(request, data: DelayPreparationRequest):
     """
     API endpoint for delaying a preparation (adding more time).
 
@@ -268,24 +272,68 @@ def delay_preparation(request):
         "delayed_to": "2025-12-17T18:00:00Z"
     }
     """
-    try:
-        data = json.loads(request.body)
-        preparation_id = data['preparation_id']
-        delayed_to = data['delayed_to']
+    preparation = get_or_404(Preparation.objects.for_location(data.location), id=data.preparation_id)
+    services.delay_preparation(preparation, data.delayed_to)
+
+    return JsonResponse({
+        'status': 'success',
+        'preparation_id': preparation.id,
+        'delayed_to': preparation.delayed_to
+    })
+
+
+@csrf_exempt
+@require_POST
+@validate_body(SyncRequest)
+def sync(request, data: SyncRequest):
+    """
+    API endpoint for replaying operations queued by a client while it was offline.
 
-        preparation = Preparation.objects.get(id=preparation_id)
-        preparation.delayed_to = delayed_to
-        preparation.save()
+    Operations are applied in order, at most once per operation_id. The
+    response has a result per operation and every preparation that changed
+    since `cursor`, so a reconnecting client catches up in one round trip.
+    Clients get their cursor from the X-Sync-Cursor header of the
+    preparations list. Without a cursor the response only has the cursor to
+    sync from next time, and the client reloads its preparations instead.
 
+    Expected payload:
+    {
+        "cursor": 120,
+        "operations": [
+            {
+                "operation_id": "6f1c...",
+                "type": "complete_item",
+                "client_timestamp": "2025-12-17T17:02:00Z",
+                "item_id": 3
+            },
+            {
+                "operation_id": "a93e...",
+                "type": "delay_preparation",
+                "client_timestamp": "2025-12-17T17:03:00Z",
+                "preparation_id": 1,
+                "delayed_to": "2025-12-17T18:00:00Z"
+            }
+        ]
+    }
+    """
+    max_operations = getattr(settings, 'PREPARATION_SYNC_MAX_OPERATIONS', 500)
+    if len(data.operations) > max_operations:
+        return JsonResponse({'error': f'Too many operations, the limit is {max_operations}'}, status=400)
+
+    results = apply_operations(data.location, data.operations)
+
+    if data.cursor is None:
         return JsonResponse({
             'status': 'success',
-            'preparation_id': preparation.id,
-            'delayed_to': preparation.delayed_to
+            'results': results,
+            'cursor': current_cursor(data.location),
         })
 
-    except Preparation.DoesNotExist:
-        return JsonResponse({'error': 'Preparation not found'}, status=404)
-    except KeyError as e:
-        return JsonResponse({'error': f'Missing field: {e}'}, status=400)
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    cursor, preparations = changes_since(data.location, data.cursor)
+
+    return JsonResponse({
+        'status': 'success',
+        'results': results,
+        'cursor': cursor,
+        'preparations': [serialize_preparation(preparation) for preparation in preparations],
+    })
@@ -14,6 +14,7 @@ export async function acceptPreparation(
   readyAt: string
 ): Promise<AcceptPreparationResponse> {
   const baseUrl = process.env.API_BASE_URL;
+  const location = process.env.KITCHEN_LOCATION;
 
   const response = await fetch(`${baseUrl}/preparations/accept_preparation/`, {
     method: "POST",
@@ -21,6 +22,7 @@ export async function acceptPreparation(
       "Content-Type": "application/json",
     },
     body: JSON.stringify({
+      location,
       preparation_id: preparationId,
       ready_at: readyAt,
     }),
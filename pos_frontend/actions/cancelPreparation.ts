@@ -12,6 +12,7 @@ export async function cancelPreparation(
   preparationId: number
 ): Promise<CancelPreparationResponse> {
   const baseUrl = process.env.API_BASE_URL;
+  const location = process.env.KITCHEN_LOCATION;
 
   const response = await fetch(`${baseUrl}/preparations/cancel_preparation/`, {
     method: "POST",
@@ -19,6 +20,7 @@ export async function cancelPreparation(
       "Content-Type": "application/json",
     },
     body: JSON.stringify({
+      location,
       preparation_id: preparationId,
     }),
   });
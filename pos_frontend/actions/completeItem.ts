@@ -11,6 +11,7 @@ interface CompleteItemResponse {
 
 export async function completeItem(itemId: number): Promise<CompleteItemResponse> {
   const baseUrl = process.env.API_BASE_URL;
+  const location = process.env.KITCHEN_LOCATION;
 
   const response = await fetch(`${baseUrl}/preparations/complete_item/`, {
     method: "POST",
@@ -18,6 +19,7 @@ export async function completeItem(itemId: number): Promise<CompleteItemResponse
       "Content-Type": "application/json",
     },
     body: JSON.stringify({
+      location,
       item_id: itemId,
     }),
   });
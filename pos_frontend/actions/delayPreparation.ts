@@ -13,6 +13,7 @@ export async function delayPreparation(
   delayedTo: string
 ): Promise<DelayPreparationResponse> {
   const baseUrl = process.env.API_BASE_URL;
+  const location = process.env.KITCHEN_LOCATION;
 
   const response = await fetch(`${baseUrl}/preparations/delay_preparation/`, {
     method: "POST",
@@ -20,6 +21,7 @@ export async function delayPreparation(
       "Content-Type": "application/json",
     },
     body: JSON.stringify({
+      location,
       preparation_id: preparationId,
       delayed_to: delayedTo,
     }),
@@ -1,11 +1,13 @@
 "use server";
 
-import { Preparation } from "@/types/preparation";
+import { PreparationList } from "@/types/preparation";
 
-export async function fetchPreparations(): Promise<Preparation[]> {
+export async function fetchPreparations(): Promise<PreparationList> {
   const baseUrl = process.env.API_BASE_URL;
+  const location = process.env.KITCHEN_LOCATION;
+  const query = location ? `?location=${encodeURIComponent(location)}` : "";
 
-  const response = await fetch(`${baseUrl}/preparations/`, {
+  const response = await fetch(`${baseUrl}/preparations/${query}`, {
     cache: "no-store",
   });
 
@@ -13,5 +15,8 @@ export async function fetchPreparations(): Promise<Preparation[]> {
     throw new Error(`Failed to fetch preparations: ${response.status}`);
   }
 
-  return response.json();
+  return {
+    preparations: await response.json(),
+    cursor: Number(response.headers.get("X-Sync-Cursor") ?? 0),
+  };
 }
@@ -12,6 +12,7 @@ export async function rejectPreparation(
   preparationId: number
 ): Promise<RejectPreparationResponse> {
   const baseUrl = process.env.API_BASE_URL;
+  const location = process.env.KITCHEN_LOCATION;
 
   const response = await fetch(`${baseUrl}/preparations/reject_preparation/`, {
     method: "POST",
@@ -19,6 +20,7 @@ export async function rejectPreparation(
       "Content-Type": "application/json",
     },
     body: JSON.stringify({
+      location,
       preparation_id: preparationId,
     }),
   });
@@ -0,0 +1,33 @@
+"use server";
+
+import { revalidatePath } from "next/cache";
+import { SyncOperation, SyncResponse } from "@/types/sync";
+
+export async function syncOperations(
+  operations: SyncOperation[],
+  cursor: number | null
+): Promise<SyncResponse> {
+  const baseUrl = process.env.API_BASE_URL;
+  const location = process.env.KITCHEN_LOCATION;
+
+  const response = await fetch(`${baseUrl}/preparations/sync/`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      location,
+      cursor,
+      operations,
+    }),
+  });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.error || `Failed to sync operations: ${response.status}`);
+  }
+
+  // Without a cursor there is no delta to apply, so reload the preparations
+  if (cursor === null) revalidatePath("/");
+  return response.json();
+}
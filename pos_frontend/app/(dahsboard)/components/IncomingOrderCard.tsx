@@ -4,6 +4,7 @@ import { Preparation } from "@/types/preparation";
 import { formatTime } from "@/utils/formatTime";
 import { acceptPreparation } from "@/actions/acceptPreparation";
 import { rejectPreparation } from "@/actions/rejectPreparation";
+import { runOrQueue } from "@/utils/syncQueue";
 import { useState, useTransition } from "react";
 
 interface IncomingOrderCardProps {
@@ -33,7 +34,11 @@ export default function IncomingOrderCard({
 
     startTransition(async () => {
       try {
-        await acceptPreparation(preparation.id, readyAt.toISOString());
+        await runOrQueue(() => acceptPreparation(preparation.id, readyAt.toISOString()), {
+          type: "accept_preparation",
+          preparation_id: preparation.id,
+          ready_at: readyAt.toISOString(),
+        });
       } catch (err) {
         setError(err instanceof Error ? err.message : "Failed to accept");
       }
@@ -44,7 +49,10 @@ export default function IncomingOrderCard({
     setError(null);
     startTransition(async () => {
       try {
-        await rejectPreparation(preparation.id);
+        await runOrQueue(() => rejectPreparation(preparation.id), {
+          type: "reject_preparation",
+          preparation_id: preparation.id,
+        });
       } catch (err) {
         setError(err instanceof Error ? err.message : "Failed to decline");
       }
@@ -6,6 +6,7 @@ import { getPreparationStatus } from "@/utils/preparationStatus";
 import { completeItem } from "@/actions/completeItem";
 import { cancelPreparation } from "@/actions/cancelPreparation";
 import { delayPreparation } from "@/actions/delayPreparation";
+import { runOrQueue } from "@/utils/syncQueue";
 import { useState, useTransition } from "react";
 
 const DELAY_OPTIONS = [
@@ -51,7 +52,10 @@ function ItemRow({ item, disabled }: { item: Item; disabled?: boolean }) {
   const handleComplete = () => {
     if (isCompleted || isPending || disabled) return;
     startTransition(async () => {
-      await completeItem(item.id);
+      await runOrQueue(() => completeItem(item.id), {
+        type: "complete_item",
+        item_id: item.id,
+      });
     });
   };
 
@@ -146,7 +150,10 @@ export default function PreparationCard({ preparation }: PreparationCardProps) {
   const handleCancel = () => {
     if (isPending) return;
     startTransition(async () => {
-      await cancelPreparation(preparation.id);
+      await runOrQueue(() => cancelPreparation(preparation.id), {
+        type: "cancel_preparation",
+        preparation_id: preparation.id,
+      });
     });
   };
 
@@ -156,7 +163,11 @@ export default function PreparationCard({ preparation }: PreparationCardProps) {
     const newTime = new Date(new Date(baseTime).getTime() + minutes * 60 * 1000);
 
     startTransition(async () => {
-      await delayPreparation(preparation.id, newTime.toISOString());
+      await runOrQueue(() => delayPreparation(preparation.id, newTime.toISOString()), {
+        type: "delay_preparation",
+        preparation_id: preparation.id,
+        delayed_to: newTime.toISOString(),
+      });
       setShowDelayOptions(false);
     });
   };
@@ -1,12 +1,13 @@
 "use client";
-import { Preparation } from "@/types/preparation";
-import { use, useState } from "react";
+import { Preparation, PreparationList } from "@/types/preparation";
+import { use, useCallback, useState } from "react";
 import PreparationCard from "./PreparationCard";
 import IncomingOrderCard from "./IncomingOrderCard";
 import OrderNotifications from "./OrderNotifications";
+import SyncManager from "./SyncManager";
 
 interface PreparationViewProps {
-  data: Promise<Preparation[]>;
+  data: Promise<PreparationList>;
 }
 
 type Tab = "in_progress" | "completed" | "rejected" | "cancelled" | "cancelled_by_customer";
@@ -24,10 +25,39 @@ const TABS: TabConfig[] = [
   { id: "cancelled_by_customer", label: "Customer Cancelled" },
 ];
 
+interface SyncedPreparations {
+  data: Promise<PreparationList>;
+  byId: Map<number, Preparation>;
+}
+
 export default function PreparationView({ data }: PreparationViewProps) {
-  const preparations = use(data);
+  const { preparations: fetched, cursor } = use(data);
   const [activeTab, setActiveTab] = useState<Tab>("in_progress");
 
+  // Preparations from the sync delta, newer than the fetched ones until the
+  // page data is fetched again
+  const [synced, setSynced] = useState<SyncedPreparations>({ data, byId: new Map() });
+  const syncedById = synced.data === data ? synced.byId : null;
+
+  const handleSync = useCallback(
+    (changed: Preparation[]) => {
+      if (changed.length === 0) return;
+      setSynced((current) => {
+        const byId = new Map(current.data === data ? current.byId : []);
+        changed.forEach((p) => byId.set(p.id, p));
+        return { data, byId };
+      });
+    },
+    [data]
+  );
+
+  const preparations = syncedById
+    ? [
+        ...fetched.map((p) => syncedById.get(p.id) ?? p),
+        ...[...syncedById.values()].filter((p) => !fetched.some((f) => f.id === p.id)),
+      ]
+    : fetched;
+
   // Filter preparations by status
   const incomingOrders = preparations.filter(
     (p) => !p.accepted_at && !p.rejected_at && !p.cancelled_at
@@ -108,6 +138,9 @@ export default function PreparationView({ data }: PreparationViewProps) {
       {/* Notification system for new orders */}
       <OrderNotifications preparations={preparations} />
 
+      {/* Replays actions queued while the kitchen was offline */}
+      <SyncManager cursor={cursor} onSync={handleSync} />
+
       {/* Incoming Orders Section - Always visible at top */}
       {incomingOrders.length > 0 && (
         <section className="mb-2">
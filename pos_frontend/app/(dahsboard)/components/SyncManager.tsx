@@ -0,0 +1,45 @@
+"use client";
+
+import { useEffect } from "react";
+import { toast } from "sonner";
+import { Preparation } from "@/types/preparation";
+import { flushQueue, getQueuedCount, storeCursor } from "@/utils/syncQueue";
+
+interface SyncManagerProps {
+  // Sync cursor of the preparations on screen
+  cursor: number;
+  onSync: (preparations: Preparation[]) => void;
+}
+
+export default function SyncManager({ cursor, onSync }: SyncManagerProps) {
+  // Stored before any flush below, so the next sync only returns what
+  // changed after the preparations on screen
+  useEffect(() => storeCursor(cursor), [cursor, onSync]);
+
+  useEffect(() => {
+    // Reconnecting always syncs, even with nothing queued, to pick up the
+    // changes missed while offline
+    const handleOnline = async () => {
+      try {
+        const { results, preparations } = await flushQueue();
+        onSync(preparations);
+        const conflicts = results.filter(
+          (r) => r.status === "conflict" || r.status === "rejected"
+        );
+        conflicts.forEach((conflict) => {
+          toast.error("Offline change not applied", {
+            description: conflict.error,
+          });
+        });
+      } catch {
+        // Still offline or the server is unreachable; retry on the next reconnect
+      }
+    };
+
+    if (getQueuedCount() > 0) handleOnline();
+    window.addEventListener("online", handleOnline);
+    return () => window.removeEventListener("online", handleOnline);
+  }, [onSync]);
+
+  return null;
+}
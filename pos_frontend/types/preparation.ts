@@ -8,6 +8,7 @@ export interface Item {
 
 export interface Preparation {
   id: number;
+  location: string;
   order_id: string;
   created_at: string;
   accepted_at: string | null;
@@ -19,3 +20,9 @@ export interface Preparation {
   completed_at: string | null;
   items: Item[];
 }
+
+export interface PreparationList {
+  preparations: Preparation[];
+  // Sync cursor matching the list, see utils/syncQueue.ts
+  cursor: number;
+}
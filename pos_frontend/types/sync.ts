@@ -0,0 +1,33 @@
+import { Preparation } from "./preparation";
+
+export type SyncOperationType =
+  | "accept_preparation"
+  | "reject_preparation"
+  | "cancel_preparation"
+  | "delay_preparation"
+  | "complete_item";
+
+export interface SyncOperation {
+  operation_id: string;
+  type: SyncOperationType;
+  client_timestamp: string;
+  preparation_id?: number;
+  item_id?: number;
+  ready_at?: string;
+  delayed_to?: string;
+}
+
+export interface SyncResult {
+  operation_id: string;
+  status: "applied" | "unchanged" | "conflict" | "rejected";
+  preparation_id?: number;
+  error?: string;
+}
+
+export interface SyncResponse {
+  status: string;
+  results: SyncResult[];
+  cursor: number;
+  // Only present when a cursor was sent
+  preparations?: Preparation[];
+}
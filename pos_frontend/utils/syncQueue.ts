@@ -0,0 +1,94 @@
+import { syncOperations } from "@/actions/syncOperations";
+import { Preparation } from "@/types/preparation";
+import { SyncOperation, SyncResult } from "@/types/sync";
+
+const QUEUE_KEY = "pos.syncQueue";
+const CURSOR_KEY = "pos.syncCursor";
+
+type QueuedOperation = Omit<SyncOperation, "operation_id" | "client_timestamp">;
+
+function readQueue(): SyncOperation[] {
+  const raw = window.localStorage.getItem(QUEUE_KEY);
+  return raw ? JSON.parse(raw) : [];
+}
+
+function writeQueue(queue: SyncOperation[]) {
+  window.localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+}
+
+/**
+ * Remember the sync cursor of the preparations the client has, so the next
+ * sync only returns what changed after them.
+ */
+export function storeCursor(cursor: number) {
+  window.localStorage.setItem(CURSOR_KEY, String(cursor));
+}
+
+export function getQueuedCount(): number {
+  return readQueue().length;
+}
+
+export function queueOperation(operation: QueuedOperation) {
+  writeQueue([
+    ...readQueue(),
+    {
+      ...operation,
+      operation_id: crypto.randomUUID(),
+      client_timestamp: new Date().toISOString(),
+    },
+  ]);
+}
+
+// A failed server action call while offline surfaces as a TypeError from fetch
+function isNetworkError(err: unknown): boolean {
+  return !navigator.onLine || err instanceof TypeError;
+}
+
+/**
+ * Run an action directly, or queue it for the next sync if the network is down.
+ * Returns true if the operation was queued.
+ */
+export async function runOrQueue(
+  action: () => Promise<unknown>,
+  operation: QueuedOperation
+): Promise<boolean> {
+  if (!navigator.onLine) {
+    queueOperation(operation);
+    return true;
+  }
+  try {
+    await action();
+    return false;
+  } catch (err) {
+    if (!isNetworkError(err)) throw err;
+    queueOperation(operation);
+    return true;
+  }
+}
+
+export interface FlushResult {
+  results: SyncResult[];
+  // Preparations that changed since the last sync, if there was one
+  preparations: Preparation[];
+}
+
+/**
+ * Send every queued operation in one request. Operations stay queued until
+ * the server has answered, so a failed flush can simply be retried.
+ */
+export async function flushQueue(): Promise<FlushResult> {
+  const queue = readQueue();
+  const stored = window.localStorage.getItem(CURSOR_KEY);
+  const cursor = stored === null ? null : Number(stored);
+
+  const response = await syncOperations(queue, cursor);
+
+  const sent = new Set(queue.map((op) => op.operation_id));
+  writeQueue(readQueue().filter((op) => !sent.has(op.operation_id)));
+  storeCursor(response.cursor);
+
+  return {
+    results: response.results,
+    preparations: response.preparations ?? [],
+  };
+}